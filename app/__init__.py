@@ -1,13 +1,51 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, abort, jsonify, g, has_request_context
+from flask import session as flask_session
 import os
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
+from flask_sqlalchemy.pagination import Pagination
 from dotenv import load_dotenv
 import pymysql
-from sqlalchemy import or_, func
+from sqlalchemy import or_, and_, func, event, case
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session, validates
+import click
 from urllib.parse import quote_plus
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 import csv
-from io import StringIO
+from io import StringIO, BytesIO
+import gzip
+import zlib
+from dataclasses import dataclass
+from collections import OrderedDict
+import hashlib
+import json
+import mimetypes
+import re
+import subprocess
+import sys
+import random
+import socket
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from markupsafe import Markup, escape
+from werkzeug.exceptions import ServiceUnavailable
+
+import time
+from contextvars import ContextVar
+from jinja2 import FileSystemBytecodeCache
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; uploads are then served without variants
+    Image = None
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; responses fall back to gzip
+    brotli = None
 
 load_dotenv()
 
@@ -23,8 +61,76 @@ app = Flask(
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///sophies_garden.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
+app.config['AUTO_CREATE_TABLES'] = os.environ.get('AUTO_CREATE_TABLES', '1') == '1'  # migrations/env.py turns this off
+# Optional read replicas (comma-separated URLs), registered as binds replica_0..N
+app.config['DATABASE_REPLICA_URLS'] = [u.strip() for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip()]
+app.config['SQLALCHEMY_BINDS'] = {f'replica_{i}': url for i, url in enumerate(app.config['DATABASE_REPLICA_URLS'])}
+app.config['REPLICA_PIN_SECONDS'] = float(os.environ.get('REPLICA_PIN_SECONDS', '5'))
+app.config['REPLICA_HEALTH_INTERVAL'] = float(os.environ.get('REPLICA_HEALTH_INTERVAL', '10'))
+app.config['REPLICA_COOLDOWN'] = float(os.environ.get('REPLICA_COOLDOWN', '30'))
+app.config['CATALOG_CHECK_INTERVAL'] = float(os.environ.get('CATALOG_CHECK_INTERVAL', '2'))
+app.config['FRAGMENT_CACHE_SIZE'] = int(os.environ.get('FRAGMENT_CACHE_SIZE', '5000'))
+app.config['JOB_RUNNER'] = os.environ.get('JOB_RUNNER', 'thread')  # thread or off
+app.config['JOB_POLL_INTERVAL'] = float(os.environ.get('JOB_POLL_INTERVAL', '30'))
+app.config['JOB_LOCK_TIMEOUT'] = float(os.environ.get('JOB_LOCK_TIMEOUT', '900'))
+app.config['JOB_RETRY_DELAY'] = float(os.environ.get('JOB_RETRY_DELAY', '60'))
+app.config['REQUEST_TIME_BUDGET_MS'] = int(os.environ.get('REQUEST_TIME_BUDGET_MS', '10000'))
+app.config['MAX_CONCURRENT_REQUESTS'] = int(os.environ.get('MAX_CONCURRENT_REQUESTS', '0'))  # per process; 0 = no limit
+app.config['MAX_QUEUED_REQUESTS'] = int(os.environ.get('MAX_QUEUED_REQUESTS', '8'))
+app.config['LOAD_SHED_RETRY_AFTER'] = int(os.environ.get('LOAD_SHED_RETRY_AFTER', '2'))
+app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', os.path.join(os.path.dirname(app.root_path), 'uploads'))
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', '6'))
+app.config['JINJA_CACHE_DIR'] = os.environ.get('JINJA_CACHE_DIR', os.path.join(os.path.dirname(app.root_path), '.jinja_cache'))
+
+# Persist compiled template bytecode so each gunicorn worker (and each restart)
+# loads templates without recompiling them from source.
+try:
+    os.makedirs(app.config['JINJA_CACHE_DIR'], exist_ok=True)
+    app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(app.config['JINJA_CACHE_DIR'])}
+except OSError as e:
+    print(f"Warning: Jinja bytecode cache disabled: {e}")
+
+class RoutingSession(FlaskSQLAlchemySession):
+    """Sends plain SELECTs to the request's read replica, everything else to the primary.
+
+    Flushes, bulk UPDATE/DELETE, raw connections and any read issued after a
+    write in the same request all use the primary (see _before_request_replica).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            is_select = clause is not None and getattr(clause, 'is_select', False)
+            if self._flushing or not is_select:
+                g.db_wrote = True
+            elif g.get('db_replica') and not g.get('db_wrote'):
+                return self._db.engines[g.db_replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+# Canonical category values are stored at write time, so filters can compare
+# with `==` and use the category indexes instead of lower()/IN over aliases.
+CATEGORY_ALIASES = {
+    'flowers': 'flower',
+    'fruits': 'fruit',
+    'vegetables': 'vegetable',
+    'veggies': 'vegetable',
+    'veggie': 'vegetable',
+    'herbs': 'herb',
+    'trees': 'tree',
+}
+
+
+def normalize_category(value):
+    value = (value or '').strip().lower()
+    return CATEGORY_ALIASES.get(value, value)
+
+
+def normalize_status(value):
+    return (value or '').strip().lower()
 
 class ContactMessage(db.Model):
     __tablename__ = 'contact_messages'
@@ -35,6 +141,12 @@ class ContactMessage(db.Model):
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.now())
     is_read = db.Column(db.Boolean, default=False)
+    is_archived = db.Column(db.Boolean, default=False, server_default='0', nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_contact_messages_is_read_created_at', 'is_read', 'created_at'),
+        db.Index('ix_contact_messages_is_archived_created_at', 'is_archived', 'created_at', 'id'),
+    )
 
 class Plant(db.Model):
     __tablename__ = 'plants'
@@ -48,6 +160,14 @@ class Plant(db.Model):
     in_stock = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=db.func.now())
 
+    __table_args__ = (
+        db.Index('ix_plants_in_stock_category', 'in_stock', 'category'),
+    )
+
+    @validates('category')
+    def _normalize_category(self, key, value):
+        return normalize_category(value)
+
 class BlogPost(db.Model):
     __tablename__ = 'blog_posts'
     id = db.Column(db.Integer, primary_key=True)
@@ -78,6 +198,32 @@ class GardenPlant(db.Model):
     status = db.Column(db.String(30), default='active')  # active, harvested, removed
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=db.func.now())
+    # Milestones, maintained on observation/harvest writes (see _sync_milestones)
+    first_flower_date = db.Column(db.Date)
+    first_fruit_date = db.Column(db.Date)
+    first_harvest_date = db.Column(db.Date)
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
+    change_seq = db.Column(db.BigInteger, index=True)  # see _assign_change_seq
+    cache_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # see _bump_plant_cache_versions
+    # Care schedule, maintained on care writes and recomputed nightly (see _sync_care_schedule)
+    last_watered_date = db.Column(db.Date)
+    last_fertilized_date = db.Column(db.Date)
+    next_water_date = db.Column(db.Date)
+    next_fertilize_date = db.Column(db.Date)
+
+    __table_args__ = (
+        db.Index('ix_garden_plants_status_category', 'status', 'category'),
+        # Ids of archived plants live on in plant_archives and sync clients; never hand them out again
+        {'sqlite_autoincrement': True},
+    )
+
+    @validates('category')
+    def _normalize_category(self, key, value):
+        return normalize_category(value)
+
+    @validates('status')
+    def _normalize_status(self, key, value):
+        return normalize_status(value)
 
     observations = db.relationship('Observation', backref='plant', cascade='all, delete-orphan')
     care_events = db.relationship('CareEvent', backref='plant', cascade='all, delete-orphan')
@@ -87,7 +233,7 @@ class Observation(db.Model):
     __tablename__ = 'observations'
     id = db.Column(db.Integer, primary_key=True)
     plant_id = db.Column(db.Integer, db.ForeignKey('garden_plants.id'), nullable=False)
-    date = db.Column(db.Date, default=db.func.current_date())
+    date = db.Column(db.Date, default=db.func.current_date(), index=True)
     height_cm = db.Column(db.Float)
     leaves = db.Column(db.Integer)
     flowers = db.Column(db.Integer)
@@ -97,47 +243,2102 @@ class Observation(db.Model):
     photo_url = db.Column(db.String(300))
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=db.func.now())
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
+    change_seq = db.Column(db.BigInteger, index=True)
 
 class CareEvent(db.Model):
     __tablename__ = 'care_events'
     id = db.Column(db.Integer, primary_key=True)
     plant_id = db.Column(db.Integer, db.ForeignKey('garden_plants.id'), nullable=False)
-    date = db.Column(db.Date, default=db.func.current_date())
+    date = db.Column(db.Date, default=db.func.current_date(), index=True)
     type = db.Column(db.String(50))  # watering, fertilizing, pruning, weeding, transplanting, spray
     amount = db.Column(db.String(100))  # e.g., 500ml or 10-10-10 5g
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=db.func.now())
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
+    change_seq = db.Column(db.BigInteger, index=True)
 
 class Harvest(db.Model):
     __tablename__ = 'harvests'
     id = db.Column(db.Integer, primary_key=True)
     plant_id = db.Column(db.Integer, db.ForeignKey('garden_plants.id'), nullable=False)
-    date = db.Column(db.Date, default=db.func.current_date())
+    date = db.Column(db.Date, default=db.func.current_date(), index=True)
     quantity = db.Column(db.Float)
     unit = db.Column(db.String(20))  # g, kg, count
     quality = db.Column(db.String(50))
     notes = db.Column(db.Text)
     photo_url = db.Column(db.String(300))
     created_at = db.Column(db.DateTime, default=db.func.now())
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
+    change_seq = db.Column(db.BigInteger, index=True)
+
+class SyncSequence(db.Model):
+    """Single-row counter for change sequence numbers."""
+    __tablename__ = 'sync_sequence'
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+class CompanionRule(db.Model):
+    """Symmetric companion-planting rule; names are normalized and stored with plant_a < plant_b."""
+    __tablename__ = 'companion_rules'
+    id = db.Column(db.Integer, primary_key=True)
+    plant_a = db.Column(db.String(100), nullable=False)
+    plant_b = db.Column(db.String(100), nullable=False, index=True)
+    relation = db.Column(db.String(10), nullable=False)  # good, avoid
+    notes = db.Column(db.String(300))
 
-# Ensure tables exist (safe no-ops for existing tables)
-with app.app_context():
+    __table_args__ = (
+        db.UniqueConstraint('plant_a', 'plant_b', name='uq_companion_rules_pair'),
+    )
+
+class DataVersion(db.Model):
+    """Named counters bumped on writes, for cheap cache invalidation checks."""
+    __tablename__ = 'data_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+class SyncTombstone(db.Model):
+    __tablename__ = 'sync_tombstones'
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)  # plants, observations, care_events, harvests
+    entity_id = db.Column(db.Integer, nullable=False)
+    plant_id = db.Column(db.Integer)
+    change_seq = db.Column(db.BigInteger, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, default=db.func.now())
+
+class PlantArchive(db.Model):
+    """Cold storage for one logbook plant: zlib-compressed JSON of archived rows.
+
+    `plant` is only set once the plant itself has been archived; before that
+    the payload holds old events of a still-hot plant.
+    """
+    __tablename__ = 'plant_archives'
+    plant_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    plant = db.Column(db.Text)  # JSON of the garden_plants row, when archived
+    payload = db.Column(db.LargeBinary(length=2**24 - 1), nullable=False)
+    row_count = db.Column(db.Integer, default=0)
+    # Milestones over the archived rows, folded into _compute_milestones
+    first_flower_date = db.Column(db.Date)
+    first_fruit_date = db.Column(db.Date)
+    first_harvest_date = db.Column(db.Date)
+    # Latest archived care, folded into _compute_last_care
+    last_watered_date = db.Column(db.Date)
+    last_fertilized_date = db.Column(db.Date)
+    archived_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
+
+class ScheduledJob(db.Model):
+    """One row per registered background job: schedule, lock and run metrics."""
+    __tablename__ = 'scheduled_jobs'
+    name = db.Column(db.String(64), primary_key=True)
+    schedule = db.Column(db.String(64), nullable=False)  # cron expression, UTC
+    next_run_at = db.Column(db.DateTime, nullable=False, index=True)
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0, nullable=False)  # consecutive failures
+    last_started_at = db.Column(db.DateTime)
+    last_finished_at = db.Column(db.DateTime)
+    last_status = db.Column(db.String(20))  # ok, retrying, failed
+    last_error = db.Column(db.Text)
+    last_duration_ms = db.Column(db.Float)
+    max_duration_ms = db.Column(db.Float)
+    total_duration_ms = db.Column(db.Float, default=0, nullable=False)
+    run_count = db.Column(db.Integer, default=0, nullable=False)
+    failure_count = db.Column(db.Integer, default=0, nullable=False)
+
+class CareDigest(db.Model):
+    """Daily care summary built by the care-digest job."""
+    __tablename__ = 'care_digests'
+    digest_date = db.Column(db.Date, primary_key=True)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=db.func.now())
+
+# ---- Plant milestones ----
+
+MILESTONE_FIELDS = ('first_flower_date', 'first_fruit_date', 'first_harvest_date')
+
+
+def _compute_milestones(plant_ids=None, exclude_obs_ids=(), exclude_harvest_ids=()):
+    """Derive milestone dates from history with grouped MIN() queries.
+
+    Returns {plant_id: {field: date}} for the given plants (or all plants).
+    """
+    obs_filters = [Observation.date.isnot(None)]
+    hv_filters = [Harvest.date.isnot(None)]
+    if plant_ids is not None:
+        obs_filters.append(Observation.plant_id.in_(plant_ids))
+        hv_filters.append(Harvest.plant_id.in_(plant_ids))
+    if exclude_obs_ids:
+        obs_filters.append(Observation.id.notin_(exclude_obs_ids))
+    if exclude_harvest_ids:
+        hv_filters.append(Harvest.id.notin_(exclude_harvest_ids))
+
+    queries = {
+        'first_flower_date': db.session.query(Observation.plant_id, func.min(Observation.date))
+            .filter(Observation.flowers > 0, *obs_filters).group_by(Observation.plant_id),
+        'first_fruit_date': db.session.query(Observation.plant_id, func.min(Observation.date))
+            .filter(Observation.fruits > 0, *obs_filters).group_by(Observation.plant_id),
+        'first_harvest_date': db.session.query(Harvest.plant_id, func.min(Harvest.date))
+            .filter(*hv_filters).group_by(Harvest.plant_id),
+    }
+    result = {}
+    for field, query in queries.items():
+        for pid, d in query.all():
+            result.setdefault(pid, {})[field] = d
+
+    # Archived history still counts toward milestones
+    archives = PlantArchive.query.with_entities(PlantArchive.plant_id, *[getattr(PlantArchive, f) for f in MILESTONE_FIELDS])
+    if plant_ids is not None:
+        archives = archives.filter(PlantArchive.plant_id.in_(plant_ids))
+    for pid, *dates in archives.all():
+        values = result.setdefault(pid, {})
+        for field, d in zip(MILESTONE_FIELDS, dates):
+            if d is not None and (values.get(field) is None or d < values[field]):
+                values[field] = d
+    return result
+
+
+def _apply_milestone(plant, field, date):
+    """Move a stored milestone earlier if `date` precedes it (back-dated entries)."""
+    if date is None:
+        return
+    current = getattr(plant, field)
+    if current is None or date < current:
+        setattr(plant, field, date)
+
+
+def _apply_row_milestones(plant, row):
+    if isinstance(row, Observation):
+        if row.flowers and row.flowers > 0:
+            _apply_milestone(plant, 'first_flower_date', row.date)
+        if row.fruits and row.fruits > 0:
+            _apply_milestone(plant, 'first_fruit_date', row.date)
+    elif isinstance(row, Harvest):
+        _apply_milestone(plant, 'first_harvest_date', row.date)
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_milestones(session, flush_context, instances):
+    """Keep GardenPlant milestone dates in step with observation/harvest writes.
+
+    Runs for every write path (routes, bulk imports, shell). New rows can
+    only move a milestone earlier, so they are applied incrementally; edited
+    or deleted rows may move it later, so those plants are recomputed from
+    history. The aggregates run before this flush writes anything, so edited
+    and deleted rows are excluded from them and edited rows are applied from
+    their in-memory values afterwards, like new ones.
+    """
+    pending_rows = [o for o in session.new if isinstance(o, (Observation, Harvest))]
+    stale = set()
+    changed_obs, changed_hv = [], []
+    for obj in session.dirty:
+        if isinstance(obj, (Observation, Harvest)) and session.is_modified(obj):
+            (changed_obs if isinstance(obj, Observation) else changed_hv).append(obj.id)
+            stale.add(obj.plant_id)
+            pending_rows.append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Observation):
+            changed_obs.append(obj.id)
+            stale.add(obj.plant_id)
+        elif isinstance(obj, Harvest):
+            changed_hv.append(obj.id)
+            stale.add(obj.plant_id)
+    # A row may have moved between plants; its stored plant_id is still the old one
+    for model, ids in ((Observation, changed_obs), (Harvest, changed_hv)):
+        if ids:
+            stale.update(pid for (pid,) in session.query(model.plant_id).filter(model.id.in_(ids)))
+    stale.discard(None)
+
+    if stale:
+        computed = _compute_milestones(stale, changed_obs, changed_hv)
+        for pid in stale:
+            plant = session.get(GardenPlant, pid)
+            if plant is None or plant in session.deleted:
+                continue
+            values = computed.get(pid, {})
+            for field in MILESTONE_FIELDS:
+                setattr(plant, field, values.get(field))
+
+    # Pending values are not visible to the aggregates, so apply them last
+    for row in pending_rows:
+        plant = session.get(GardenPlant, row.plant_id) if row.plant_id is not None else row.plant
+        if plant is not None:
+            _apply_row_milestones(plant, row)
+
+
+# ---- Care schedule ----
+# Last watering/fertilizing dates are kept on the plant so list pages can show
+# what is due without loading each plant's care history. New care rows move
+# them incrementally; edits and deletes recompute the affected plants. The
+# nightly recompute-due-dates job repairs drift on active plants. Plants with
+# no care and no planting date store no due date and read as due now.
+
+WATER_INTERVALS = {'flower': 3, 'fruit': 2, 'vegetable': 2, 'herb': 2, 'tree': 4, 'other': 3}
+FERTILIZE_INTERVALS = {'flower': 14, 'fruit': 14, 'vegetable': 14, 'herb': 21, 'tree': 30, 'other': 14}
+CARE_SCHEDULE = {
+    'watering': ('last_watered_date', 'next_water_date', WATER_INTERVALS),
+    'fertilizing': ('last_fertilized_date', 'next_fertilize_date', FERTILIZE_INTERVALS),
+}
+
+
+def _compute_last_care(plant_ids=None, exclude_ids=()):
+    """Latest watering/fertilizing date per plant: {plant_id: {last_field: date}}."""
+    care_type = func.lower(CareEvent.type)
+    filters = [CareEvent.date.isnot(None), care_type.in_(list(CARE_SCHEDULE))]
+    if plant_ids is not None:
+        filters.append(CareEvent.plant_id.in_(plant_ids))
+    if exclude_ids:
+        filters.append(CareEvent.id.notin_(exclude_ids))
+    query = (db.session.query(CareEvent.plant_id, care_type, func.max(CareEvent.date))
+             .filter(*filters).group_by(CareEvent.plant_id, care_type))
+    result = {}
+    for pid, kind, d in query.all():
+        result.setdefault(pid, {})[CARE_SCHEDULE[kind][0]] = d
+
+    # Archived care still counts, or archiving old waterings would make a plant due now
+    fields = [last_field for last_field, _, _ in CARE_SCHEDULE.values()]
+    archives = PlantArchive.query.with_entities(PlantArchive.plant_id, *[getattr(PlantArchive, f) for f in fields])
+    if plant_ids is not None:
+        archives = archives.filter(PlantArchive.plant_id.in_(plant_ids))
+    for pid, *dates in archives.all():
+        values = result.setdefault(pid, {})
+        for field, d in zip(fields, dates):
+            if d is not None and (values.get(field) is None or d > values[field]):
+                values[field] = d
+    return result
+
+
+def _apply_due_dates(plant):
+    """Derive next_* dates from the last care (or planting) date.
+
+    With neither, no date is stored: "due now" is decided at read time, so
+    the stored row does not change every day.
+    """
+    cat = (plant.category or 'other').lower()
+    for last_field, next_field, intervals in CARE_SCHEDULE.values():
+        interval = timedelta(days=intervals.get(cat, intervals['other']))
+        last = getattr(plant, last_field)
+        if last is not None:
+            due = last + interval
+        elif plant.planting_date is not None:
+            due = plant.planting_date + interval
+        else:
+            due = None
+        if getattr(plant, next_field) != due:
+            setattr(plant, next_field, due)
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_care_schedule(session, flush_context, instances):
+    """Keep GardenPlant care dates in step with care event writes.
+
+    Same approach as _sync_milestones: edited and deleted rows are excluded
+    from the recompute (it reads what is stored before this flush) and
+    pending values, new or edited, are applied on top.
+    """
+    pending_rows = [o for o in session.new if isinstance(o, CareEvent)]
+    touched = {o for o in session.new if isinstance(o, GardenPlant)}
+    touched.update(o for o in session.dirty if isinstance(o, GardenPlant) and session.is_modified(o))
+    stale, changed = set(), []
+    for obj in session.dirty:
+        if isinstance(obj, CareEvent) and session.is_modified(obj):
+            changed.append(obj.id)
+            stale.add(obj.plant_id)
+            pending_rows.append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, CareEvent):
+            changed.append(obj.id)
+            stale.add(obj.plant_id)
+    if changed:  # rows may have moved between plants
+        stale.update(pid for (pid,) in session.query(CareEvent.plant_id).filter(CareEvent.id.in_(changed)))
+    stale.discard(None)
+
+    if stale:
+        computed = _compute_last_care(stale, changed)
+        for pid in stale:
+            plant = session.get(GardenPlant, pid)
+            if plant is None or plant in session.deleted:
+                continue
+            values = computed.get(pid, {})
+            for last_field, _, _ in CARE_SCHEDULE.values():
+                setattr(plant, last_field, values.get(last_field))
+            touched.add(plant)
+
+    for row in pending_rows:
+        kind = CARE_SCHEDULE.get((row.type or '').lower())
+        plant = session.get(GardenPlant, row.plant_id) if row.plant_id is not None else row.plant
+        if kind is None or plant is None or row.date is None:
+            continue
+        current = getattr(plant, kind[0])
+        if current is None or row.date > current:
+            setattr(plant, kind[0], row.date)
+        touched.add(plant)
+
+    for plant in touched:
+        if plant not in session.deleted:
+            _apply_due_dates(plant)
+
+
+# ---- Sync change feed ----
+
+SYNC_ENTITIES = {
+    'plants': GardenPlant,
+    'observations': Observation,
+    'care_events': CareEvent,
+    'harvests': Harvest,
+}
+_SYNC_ENTITY_NAMES = {model: name for name, model in SYNC_ENTITIES.items()}
+
+
+def _allocate_change_seqs(session, count):
+    """Reserve `count` sequence numbers and return the first one.
+
+    The UPDATE takes a row lock on the counter that is held until commit,
+    so sequence order matches commit order and a client holding token N
+    can never later miss a row that commits with a seq below N.
+    """
+    table = SyncSequence.__table__
+    conn = session.connection()
+    result = conn.execute(table.update().where(table.c.id == 1).values(value=table.c.value + count))
+    if result.rowcount == 0:
+        conn.execute(table.insert().values(id=1, value=count))
+    return conn.execute(db.select(table.c.value).where(table.c.id == 1)).scalar() - count + 1
+
+
+@event.listens_for(Session, 'before_flush')
+def _assign_change_seq(session, flush_context, instances):
+    """Stamp inserted/updated synced rows with a change seq; tombstone deletes.
+
+    Registered after _sync_milestones so milestone updates are stamped too.
+    Bulk Query.update()/delete() bypass this hook and must not be used on
+    synced tables.
+    """
+    changed = [o for o in session.new if type(o) in _SYNC_ENTITY_NAMES]
+    changed += [o for o in session.dirty
+                if type(o) in _SYNC_ENTITY_NAMES and session.is_modified(o, include_collections=False)]
+    deleted = [o for o in session.deleted if type(o) in _SYNC_ENTITY_NAMES and o.id is not None]
+    if not changed and not deleted:
+        return
+    seq = _allocate_change_seqs(session, len(changed) + len(deleted))
+    for obj in changed:
+        obj.change_seq = seq
+        seq += 1
+    for obj in deleted:
+        session.add(SyncTombstone(
+            entity=_SYNC_ENTITY_NAMES[type(obj)],
+            entity_id=obj.id,
+            plant_id=obj.id if isinstance(obj, GardenPlant) else obj.plant_id,
+            change_seq=seq,
+        ))
+        seq += 1
+
+
+def _sync_dict(obj):
+    row = {}
+    for col in obj.__table__.columns:
+        value = getattr(obj, col.name)
+        row[col.name] = value.isoformat() if isinstance(value, (date, datetime)) else value
+    return row
+
+
+@app.route('/api/sync/changes')
+def sync_changes():
+    """Rows created, updated or deleted since `since` (a previous next_token).
+
+    Results are ordered by change seq across all synced tables and cut at
+    `limit`; clients repeat with `since=next_token` until has_more is false.
+    """
+    since = request.args.get('since', 0, type=int)
+    limit = max(1, min(request.args.get('limit', 500, type=int), 2000))
+
+    candidates = []
+    for name, model in SYNC_ENTITIES.items():
+        rows = (model.query.filter(model.change_seq > since)
+                .order_by(model.change_seq).limit(limit + 1).all())
+        candidates += [(row.change_seq, name, row) for row in rows]
+    tombstones = (SyncTombstone.query.filter(SyncTombstone.change_seq > since)
+                  .order_by(SyncTombstone.change_seq).limit(limit + 1).all())
+    candidates += [(t.change_seq, None, t) for t in tombstones]
+    candidates.sort(key=lambda c: c[0])
+
+    has_more = len(candidates) > limit
+    candidates = candidates[:limit]
+    changes = {name: [] for name in SYNC_ENTITIES}
+    deleted = []
+    for seq, name, row in candidates:
+        if name is None:
+            deleted.append({'entity': row.entity, 'id': row.entity_id, 'plant_id': row.plant_id, 'change_seq': seq})
+        else:
+            changes[name].append(_sync_dict(row))
+    next_token = candidates[-1][0] if candidates else since
+    return jsonify({'changes': changes, 'deleted': deleted, 'next_token': next_token, 'has_more': has_more})
+
+
+# ---- Archival ----
+# Inactive plants (harvested/removed, untouched for the retention window) move
+# wholesale into plant_archives, and events older than the window move out of
+# the hot tables for active plants too. Rows are removed with Core deletes so
+# the sync feed does not tombstone them: offline clients keep their copies.
+
+ARCHIVE_EVENT_MODELS = {
+    'observations': Observation,
+    'care_events': CareEvent,
+    'harvests': Harvest,
+}
+INACTIVE_STATUSES = ('harvested', 'removed')
+
+
+def _row_from_dict(model, data):
+    """Rebuild a transient (never added to the session) model instance."""
+    values = {}
+    for col in model.__table__.columns:
+        value = data.get(col.name)
+        if isinstance(value, str) and isinstance(col.type, db.DateTime):
+            value = datetime.fromisoformat(value)
+        elif isinstance(value, str) and isinstance(col.type, db.Date):
+            value = date.fromisoformat(value)
+        values[col.name] = value
+    return model(**values)
+
+
+def _load_archive_payload(archive):
+    if archive is None:
+        return {name: [] for name in ARCHIVE_EVENT_MODELS}
+    return json.loads(zlib.decompress(archive.payload))
+
+
+def load_plant_history(plant_id):
+    """Return (plant, observations, care, harvests, archived) across hot and cold storage.
+
+    Event lists are newest first. `archived` is True when the plant row itself
+    only exists in the archive (its objects are then transient).
+    """
+    plant = db.session.get(GardenPlant, plant_id)
+    archive = db.session.get(PlantArchive, plant_id)
+    if plant is None and (archive is None or archive.plant is None):
+        abort(404)
+    cold = _load_archive_payload(archive)
+    archived = plant is None
+    if archived:
+        plant = _row_from_dict(GardenPlant, json.loads(archive.plant))
+
+    history = []
+    for name, model in ARCHIVE_EVENT_MODELS.items():
+        rows = [_row_from_dict(model, r) for r in cold.get(name, [])]
+        if not archived:
+            rows += model.query.filter_by(plant_id=plant_id).all()
+        rows.sort(key=lambda r: (r.date or date.min, r.created_at or datetime.min), reverse=True)
+        history.append(rows)
+    return (plant, *history, archived)
+
+
+def _archive_plant_rows(plant_id, cutoff_date, whole_plant):
+    """Move one plant's old events (or everything, with its row) into its archive."""
+    archive = db.session.get(PlantArchive, plant_id)
+    plant = db.session.get(GardenPlant, plant_id) if whole_plant else None
+    payload = _load_archive_payload(archive)
+    moved = 0
+    with db.session.no_autoflush:
+        for name, model in ARCHIVE_EVENT_MODELS.items():
+            query = model.query.filter(model.plant_id == plant_id)
+            if not whole_plant:
+                query = query.filter(model.date < cutoff_date)
+            rows = query.all()
+            if not rows:
+                continue
+            payload.setdefault(name, []).extend(_sync_dict(r) for r in rows)
+            db.session.execute(model.__table__.delete().where(model.__table__.c.id.in_([r.id for r in rows])))
+            for r in rows:
+                db.session.expunge(r)
+            moved += len(rows)
+        if plant is not None:
+            plant_row = json.dumps(_sync_dict(plant))
+            db.session.execute(GardenPlant.__table__.delete().where(GardenPlant.__table__.c.id == plant_id))
+            db.session.expunge(plant)
+            moved += 1
+
+        def _first(rows, predicate=lambda r: True, pick=min):
+            dates = [r['date'] for r in rows if r.get('date') and predicate(r)]
+            return date.fromisoformat(pick(dates)) if dates else None
+
+        def _last(rows, predicate):
+            return _first(rows, predicate, pick=max)
+
+        if archive is None:
+            archive = PlantArchive(plant_id=plant_id)
+            db.session.add(archive)
+        if plant is not None:
+            archive.plant = plant_row
+        observations = payload.get('observations', [])
+        archive.first_flower_date = _first(observations, lambda r: (r.get('flowers') or 0) > 0)
+        archive.first_fruit_date = _first(observations, lambda r: (r.get('fruits') or 0) > 0)
+        archive.first_harvest_date = _first(payload.get('harvests', []))
+        for kind, (last_field, _, _) in CARE_SCHEDULE.items():
+            setattr(archive, last_field, _last(payload.get('care_events', []),
+                                               lambda r: (r.get('type') or '').lower() == kind))
+        archive.row_count = sum(len(v) for v in payload.values())
+        archive.payload = zlib.compress(json.dumps(payload).encode('utf-8'), 6)
+        if plant is None and moved:
+            _bump_plant_cache_versions(db.session, [plant_id])
+    return moved
+
+
+def _archive_candidates(cutoff, cutoff_date, batch_size):
+    """Next batch of (plant_id, whole_plant) pairs with something to archive."""
+    # The newest row stays hot: MySQL before 8.0 resets AUTO_INCREMENT to MAX(id) + 1
+    # on restart, which would hand an archived plant's id to the next new plant.
+    newest = db.session.query(func.max(GardenPlant.id)).scalar_subquery()
+    inactive = [pid for (pid,) in db.session.query(GardenPlant.id)
+                .filter(GardenPlant.status.in_(INACTIVE_STATUSES), GardenPlant.id < newest,
+                        func.coalesce(GardenPlant.updated_at, GardenPlant.created_at) < cutoff)
+                .order_by(GardenPlant.id).limit(batch_size)]
+    if inactive:
+        return [(pid, True) for pid in inactive]
+    old = set()
+    for model in ARCHIVE_EVENT_MODELS.values():
+        old.update(pid for (pid,) in db.session.query(model.plant_id)
+                   .filter(model.date < cutoff_date).distinct().order_by(model.plant_id).limit(batch_size))
+    return [(pid, False) for pid in sorted(old)[:batch_size]]
+
+
+@app.cli.command('archive-history')
+@click.option('--retention-days', default=365, show_default=True, help='Keep this many days of history hot.')
+@click.option('--batch-size', default=50, show_default=True, help='Plants per transaction.')
+@click.option('--max-batches', default=0, help='Stop after this many batches (0 = until done).')
+@click.option('--pause', default=0.1, show_default=True, help='Seconds to sleep between batches.')
+def archive_history(retention_days, batch_size, max_batches, pause):
+    """Move inactive plants and old events into plant_archives, in small batches.
+
+    Each batch commits on its own, so locks are short and an interrupted run
+    simply resumes where it left off the next time it is started.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    cutoff_date = cutoff.date()
+    batches = moved = 0
+    while not max_batches or batches < max_batches:
+        candidates = _archive_candidates(cutoff, cutoff_date, batch_size)
+        if not candidates:
+            break
+        for plant_id, whole_plant in candidates:
+            moved += _archive_plant_rows(plant_id, cutoff_date, whole_plant)
+        db.session.commit()
+        batches += 1
+        click.echo(f'batch {batches}: {len(candidates)} plant(s), {moved} row(s) archived so far')
+        time.sleep(pause)
+    click.echo(f'Done: {moved} row(s) archived in {batches} batch(es).')
+
+
+@app.cli.command('check-milestones')
+@click.option('--fix', is_flag=True, help='Rewrite stored milestones that disagree with history.')
+def check_milestones(fix):
+    """Compare stored plant milestones against observation/harvest history."""
+    computed = _compute_milestones()
+    mismatches = 0
+    for plant in GardenPlant.query.order_by(GardenPlant.id).all():
+        values = computed.get(plant.id, {})
+        for field in MILESTONE_FIELDS:
+            stored, expected = getattr(plant, field), values.get(field)
+            if stored != expected:
+                mismatches += 1
+                click.echo(f'plant {plant.id}: {field} stored={stored} expected={expected}')
+                if fix:
+                    setattr(plant, field, expected)
+    if fix and mismatches:
+        db.session.commit()
+        click.echo(f'Fixed {mismatches} milestone(s).')
+    elif mismatches:
+        click.echo(f'{mismatches} milestone mismatch(es); rerun with --fix to repair.')
+        raise SystemExit(1)
+    else:
+        click.echo('All milestones consistent.')
+
+# ---- Request deadlines ----
+# Every request gets a time budget (ROUTE_TIME_BUDGETS, by endpoint). Each
+# statement carries the time left as a server-side limit: a MAX_EXECUTION_TIME
+# hint on MySQL SELECTs, and a progress handler that interrupts SQLite. A
+# request that runs out is answered with 503 instead of holding a worker for
+# gunicorn's full --timeout. With MAX_CONCURRENT_REQUESTS set (threaded
+# workers), requests beyond the limit wait in a bounded queue and are shed
+# with 503 + Retry-After when it is full. Requests that already spent their
+# budget in the proxy/gunicorn queue (X-Request-Start) are shed as well.
+
+ROUTE_TIME_BUDGETS = {
+    'blog': 3000,
+    'logbook': 5000,
+    'logbook_detail': 5000,
+    'companion_report': 5000,
+    'dashboard': 5000,
+    'sync_changes': 5000,
+    'export_log_csv': 30000,
+}
+ROUTE_TIME_BUDGETS.update({
+    name.strip(): int(ms) for name, _, ms in
+    (item.partition('=') for item in os.environ.get('ROUTE_TIME_BUDGETS', '').split(',') if '=' in item)
+})
+LOAD_SHED_EXEMPT = {'static', 'static_dist', 'request_stats'}
+SQLITE_PROGRESS_STEPS = 10000  # VM instructions between deadline checks
+
+_request_deadline = ContextVar('request_deadline', default=None)
+_request_slots = threading.BoundedSemaphore(app.config['MAX_CONCURRENT_REQUESTS'] or 1)
+_request_stats = {'requests': 0, 'in_flight': 0, 'peak_in_flight': 0, 'queued': 0,
+                  'shed': 0, 'timed_out': 0, 'endpoints': {}}
+_request_stats_lock = threading.Lock()
+
+
+class DeadlineExceeded(Exception):
+    """Raised before a statement when the request has no time left."""
+
+
+def _count_request_event(kind, endpoint=None):
+    endpoint = endpoint or request.endpoint or '-'
+    with _request_stats_lock:
+        _request_stats[kind] += 1
+        counts = _request_stats['endpoints'].setdefault(endpoint, {'shed': 0, 'timed_out': 0})
+        counts[kind] += 1
+
+
+def _shed(reason):
+    _count_request_event('shed')
+    app.logger.warning('Shedding %s %s: %s', request.method, request.path, reason)
+    raise ServiceUnavailable('The garden is busy right now, please try again shortly.',
+                             retry_after=app.config['LOAD_SHED_RETRY_AFTER'])
+
+
+def _queue_wait_ms():
+    """Time spent queued before this worker picked the request up, from X-Request-Start."""
+    raw = request.headers.get('X-Request-Start', '').strip().removeprefix('t=')
+    try:
+        started = float(raw)
+    except ValueError:
+        return None
+    # Proxies send seconds, milliseconds or microseconds since the epoch
+    while started > 1e11:
+        started /= 1000
+    return max(0.0, (time.time() - started) * 1000)
+
+
+@app.before_request
+def _start_request_deadline():
+    budget_ms = ROUTE_TIME_BUDGETS.get(request.endpoint, app.config['REQUEST_TIME_BUDGET_MS'])
+    deadline = time.perf_counter() + budget_ms / 1000
+    g.request_slot = False
+    with _request_stats_lock:
+        _request_stats['requests'] += 1
+    if request.endpoint in LOAD_SHED_EXEMPT:
+        return
+
+    waited = _queue_wait_ms()
+    if waited is not None and waited >= budget_ms:
+        _shed(f'queued {waited:.0f} ms')
+
+    limit = app.config['MAX_CONCURRENT_REQUESTS']
+    if limit and not request.environ.get('garden.async'):  # app/asgi.py limits with asyncio instead
+        with _request_stats_lock:
+            if _request_stats['in_flight'] >= limit and _request_stats['queued'] >= app.config['MAX_QUEUED_REQUESTS']:
+                full = True
+            else:
+                full = False
+                _request_stats['queued'] += 1
+        if full:
+            _shed('queue full')
+        acquired = _request_slots.acquire(timeout=max(0.0, deadline - time.perf_counter()))
+        with _request_stats_lock:
+            _request_stats['queued'] -= 1
+        if not acquired:
+            _shed('no free slot within budget')
+        g.request_slot = True
+
+    with _request_stats_lock:
+        _request_stats['in_flight'] += 1
+        _request_stats['peak_in_flight'] = max(_request_stats['peak_in_flight'], _request_stats['in_flight'])
+    g.request_counted = True
+    _request_deadline.set(deadline)
+
+
+@app.teardown_request
+def _end_request_deadline(exc):
+    _request_deadline.set(None)
+    if g.pop('request_counted', False):
+        with _request_stats_lock:
+            _request_stats['in_flight'] -= 1
+    if g.pop('request_slot', False):
+        _request_slots.release()
+
+
+def _remaining_ms():
+    deadline = _request_deadline.get()
+    return None if deadline is None else (deadline - time.perf_counter()) * 1000
+
+
+@event.listens_for(Engine, 'connect')
+def _install_sqlite_deadline(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        def _check_deadline():
+            deadline = _request_deadline.get()
+            return deadline is not None and time.perf_counter() > deadline
+        dbapi_connection.set_progress_handler(_check_deadline, SQLITE_PROGRESS_STEPS)
+
+
+@event.listens_for(Engine, 'before_cursor_execute', retval=True)
+def _apply_statement_timeout(conn, cursor, statement, parameters, context, executemany):
+    remaining = _remaining_ms()
+    if remaining is None:
+        return statement, parameters
+    if remaining <= 0:
+        raise DeadlineExceeded(statement.split(None, 1)[0])
+    if conn.dialect.name == 'mysql' and statement.lstrip()[:6].upper() == 'SELECT':
+        statement = f'SELECT /*+ MAX_EXECUTION_TIME({max(1, int(remaining))}) */' + statement.lstrip()[6:]
+    return statement, parameters
+
+
+def _is_statement_timeout(error):
+    orig = getattr(error, 'orig', None)
+    if isinstance(orig, sqlite3.OperationalError):
+        return str(orig) == 'interrupted'
+    # MySQL ER_QUERY_TIMEOUT: maximum statement execution time exceeded
+    return bool(getattr(orig, 'args', None)) and orig.args[0] == 3024
+
+
+@app.errorhandler(DeadlineExceeded)
+@app.errorhandler(OperationalError)
+def _handle_request_timeout(error):
+    if isinstance(error, OperationalError) and not _is_statement_timeout(error):
+        raise error
+    db.session.rollback()
+    _count_request_event('timed_out')
+    app.logger.warning('Request %s %s ran out of time (%s)', request.method, request.path, error.__class__.__name__)
+    return ServiceUnavailable('This page took too long to load, please try again.',
+                              retry_after=app.config['LOAD_SHED_RETRY_AFTER']).get_response()
+
+
+@app.route('/dashboard/request-stats')
+def request_stats():
+    """Per-process load counters: in-flight, queued, shed and timed-out requests."""
+    with _request_stats_lock:
+        stats = json.loads(json.dumps(_request_stats))
+    return jsonify({'pid': os.getpid(), 'max_concurrent': app.config['MAX_CONCURRENT_REQUESTS'],
+                    'max_queued': app.config['MAX_QUEUED_REQUESTS'], **stats})
+
+
+# Ensure tables exist (safe no-ops for existing tables). Skipped under alembic,
+# whose migrations would otherwise find their new tables already created.
+if app.config['AUTO_CREATE_TABLES']:
+    with app.app_context():
+        try:
+            db.create_all(bind_key=None)  # never run DDL against read replicas
+        except Exception as e:
+            # Avoid crashing the app if DB user has no DDL privileges
+            print(f"Warning: could not create tables automatically: {e}")
+
+# ---- Read replicas ----
+# GET/HEAD requests read from a healthy replica unless this browser session
+# wrote something within REPLICA_PIN_SECONDS (read-your-writes). Replicas
+# are health-checked with SELECT 1 at most every REPLICA_HEALTH_INTERVAL and
+# skipped for REPLICA_COOLDOWN after a failed check or disconnect error.
+
+_replica_state = {}  # bind key -> {'ok': bool, 'checked': ts, 'down_until': ts}
+_replica_rr = [0]
+
+
+def _mark_replica_down(name):
+    state = _replica_state.setdefault(name, {})
+    state.update(ok=False, checked=time.time(), down_until=time.time() + app.config['REPLICA_COOLDOWN'])
+    app.logger.warning('Read replica %s marked unhealthy', name)
+
+
+def _replica_healthy(name):
+    now = time.time()
+    state = _replica_state.get(name)
+    if state is None:
+        state = _replica_state[name] = {'ok': False, 'checked': 0, 'down_until': 0}
+        engine = db.engines[name]
+
+        @event.listens_for(engine, 'handle_error')
+        def _on_replica_error(context, name=name):
+            if context.is_disconnect:
+                _mark_replica_down(name)
+
+    if now < state['down_until']:
+        return False
+    if now - state['checked'] >= app.config['REPLICA_HEALTH_INTERVAL']:
+        # The probe runs outside the request's time budget: a short route budget
+        # must not interrupt it and mark a healthy replica down for REPLICA_COOLDOWN.
+        token = _request_deadline.set(None)
+        try:
+            with db.engines[name].connect() as conn:
+                conn.execute(db.text('SELECT 1'))
+            state.update(ok=True, checked=now)
+        except Exception:
+            _mark_replica_down(name)
+        finally:
+            _request_deadline.reset(token)
+    return state['ok']
+
+
+def pick_replica():
+    """Return the bind key of a healthy replica (round robin), or None."""
+    names = list(app.config['SQLALCHEMY_BINDS'])
+    for _ in range(len(names)):
+        _replica_rr[0] = (_replica_rr[0] + 1) % len(names)
+        name = names[_replica_rr[0]]
+        if _replica_healthy(name):
+            return name
+    return None
+
+
+@app.before_request
+def _before_request_replica():
+    g.db_replica = None
+    g.db_wrote = False
+    if not app.config['SQLALCHEMY_BINDS'] or request.method not in ('GET', 'HEAD'):
+        return
+    if flask_session.get('_db_primary_until', 0) > time.time():
+        return
+    g.db_replica = pick_replica()
+
+
+@app.after_request
+def _pin_primary_after_write(response):
+    if app.config['SQLALCHEMY_BINDS'] and g.get('db_wrote'):
+        flask_session['_db_primary_until'] = time.time() + app.config['REPLICA_PIN_SECONDS']
+    return response
+
+
+@app.cli.command('refresh-replicas')
+def refresh_replicas():
+    """Copy the primary SQLite database into each SQLite replica (local testing)."""
+    primary = db.engine.url
+    if primary.get_backend_name() != 'sqlite':
+        raise click.ClickException('refresh-replicas only supports SQLite; use real replication elsewhere.')
+    with db.engine.connect() as conn:
+        source = conn.connection.dbapi_connection
+        for name in app.config['SQLALCHEMY_BINDS']:
+            url = db.engines[name].url
+            if url.get_backend_name() != 'sqlite':
+                continue
+            try:
+                target = sqlite3.connect(url.database)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+            except sqlite3.Error as e:
+                click.echo(f'{name}: failed to copy to {url.database}: {e}', err=True)
+                continue
+            click.echo(f'{name}: copied to {url.database}')
+
+
+# ---- Catalog snapshot ----
+# index(), plants(), plant_detail() and blog() read from a per-worker immutable
+# snapshot of the Plant catalog and published blog metadata (no post bodies).
+# Catalog writes bump the 'catalog' DataVersion; each worker checks it at most
+# every CATALOG_CHECK_INTERVAL seconds and rebuilds only when it changed.
+
+CATALOG_MODELS = (Plant, BlogPost)
+BLOG_PREVIEW_CHARS = 161  # blog cards show content[:160] + '...' when there is no excerpt
+
+
+@dataclass(frozen=True, slots=True)
+class PlantRecord:
+    id: int
+    name: str
+    scientific_name: str
+    description: str
+    price: float
+    category: str
+    image_url: str
+    in_stock: bool
+    created_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class PostRecord:
+    id: int
+    title: str
+    slug: str
+    excerpt: str
+    content: str  # truncated preview, not the body
+    author: str
+    cover_image_url: str
+    tags: str
+    published_at: datetime
+    updated_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogSnapshot:
+    version: int
+    plants: tuple  # in-stock plants, by id
+    plants_by_id: dict
+    plants_by_category: dict
+    category_counts: dict
+    featured_plants: tuple
+    posts: tuple  # published, newest first
+    posts_by_id: dict
+    posts_by_tag: dict
+    top_tags: tuple
+
+
+class ListPagination(Pagination):
+    """Flask-SQLAlchemy pagination over an in-memory sequence."""
+
+    def _query_items(self):
+        start = (self.page - 1) * self.per_page
+        return list(self._query_args['items'][start:start + self.per_page])
+
+    def _query_count(self):
+        return len(self._query_args['items'])
+
+
+_catalog = {'snapshot': None, 'checked_at': 0.0}
+# Reentrant so greenlets sharing one thread (ASGI mode, see app/asgi.py) cannot
+# deadlock on it while a rebuild waits on the database.
+_catalog_lock = threading.RLock()
+
+
+def _bump_version(session, name):
+    table = DataVersion.__table__
+    conn = session.connection()
+    result = conn.execute(table.update().where(table.c.name == name).values(value=table.c.value + 1))
+    if result.rowcount == 0:
+        conn.execute(table.insert().values(name=name, value=1))
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_catalog_version(session, flush_context, instances):
+    if any(isinstance(o, CATALOG_MODELS) for o in (*session.new, *session.dirty, *session.deleted)):
+        _bump_version(session, 'catalog')
+        session.info['catalog_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_local_catalog(session):
+    # Our own writes are visible immediately in this worker
+    if session.info.pop('catalog_changed', False):
+        _catalog['checked_at'] = 0.0
+
+
+def _build_catalog(version):
+    plants = tuple(PlantRecord(p.id, p.name, p.scientific_name, p.description, p.price, p.category,
+                               p.image_url, bool(p.in_stock), p.created_at)
+                   for p in Plant.query.order_by(Plant.id).all())
+    in_stock = tuple(p for p in plants if p.in_stock)
+    by_category = {}
+    for p in in_stock:
+        by_category.setdefault(p.category, []).append(p)
+
+    rows = (db.session.query(BlogPost.id, BlogPost.title, BlogPost.slug, BlogPost.excerpt,
+                             func.substr(BlogPost.content, 1, BLOG_PREVIEW_CHARS), BlogPost.author,
+                             BlogPost.cover_image_url, BlogPost.tags, BlogPost.published_at, BlogPost.updated_at)
+            .filter(BlogPost.is_published == True)
+            .order_by(BlogPost.published_at.desc())
+            .all())
+    posts = tuple(PostRecord(*row) for row in rows)
+    by_tag, tag_counts = {}, {}
+    for post in posts:
+        for t in (post.tags or '').split(','):
+            t = t.strip()
+            if not t:
+                continue
+            by_tag.setdefault(t.lower(), []).append(post)
+            tag_counts[t] = tag_counts.get(t, 0) + 1
+
+    return CatalogSnapshot(
+        version=version,
+        plants=in_stock,
+        plants_by_id={p.id: p for p in plants},
+        plants_by_category={c: tuple(ps) for c, ps in by_category.items()},
+        category_counts={c: len(ps) for c, ps in sorted(by_category.items())},
+        featured_plants=tuple(sorted(in_stock, key=lambda p: p.created_at or datetime.min, reverse=True)[:6]),
+        posts=posts,
+        posts_by_id={p.id: p for p in posts},
+        posts_by_tag={t: tuple(ps) for t, ps in by_tag.items()},
+        top_tags=tuple(t for t, _ in sorted(tag_counts.items(), key=lambda kv: kv[1], reverse=True)[:12]),
+    )
+
+
+def get_catalog():
+    """Return the current CatalogSnapshot, rebuilding it only if the DB version moved."""
+    snapshot = _catalog['snapshot']
+    if snapshot is not None and time.monotonic() - _catalog['checked_at'] < app.config['CATALOG_CHECK_INTERVAL']:
+        return snapshot
+    with _catalog_lock:
+        version = db.session.query(DataVersion.value).filter_by(name='catalog').scalar() or 0
+        snapshot = _catalog['snapshot']
+        if snapshot is None or snapshot.version != version:
+            snapshot = _catalog['snapshot'] = _build_catalog(version)
+        _catalog['checked_at'] = time.monotonic()
+    return snapshot
+
+
+# ---- Companion planting ----
+
+def normalize_plant_name(value):
+    return ' '.join((value or '').lower().split())
+
+
+def _companion_key(name, known):
+    """Map a logbook plant name onto a rule name ('Cherry Tomatoes' -> 'tomato')."""
+    name = normalize_plant_name(name)
+    words = name.split()
+    for candidate in (name, words[-1] if words else ''):
+        forms = [candidate]
+        if candidate.endswith('es'):
+            forms.append(candidate[:-2])
+        if candidate.endswith('s'):
+            forms.append(candidate[:-1])
+        for form in forms:
+            if form in known:
+                return form
+    return None
+
+
+def _companion_pairs(names, relation=None):
+    """Rules touching any of `names`, as {name: {other: relation}} (uses the pair indexes)."""
+    names = list(names)
+    adjacency = {}
+    for i in range(0, len(names), 500):
+        chunk = names[i:i + 500]
+        query = db.session.query(CompanionRule.plant_a, CompanionRule.plant_b, CompanionRule.relation).filter(
+            or_(CompanionRule.plant_a.in_(chunk), CompanionRule.plant_b.in_(chunk)))
+        if relation:
+            query = query.filter(CompanionRule.relation == relation)
+        for a, b, rel in query:
+            adjacency.setdefault(a, {})[b] = rel
+            adjacency.setdefault(b, {})[a] = rel
+    return adjacency
+
+
+def _known_companion_names(names):
+    """Rule names matching the given plant names, trying the forms _companion_key tries."""
+    forms = set()
+    for name in names:
+        name = normalize_plant_name(name)
+        words = name.split()
+        for candidate in (name, words[-1] if words else ''):
+            forms.update({candidate, candidate[:-2], candidate[:-1]})
+    forms.discard('')
+    known = set()
+    forms = list(forms)
+    for i in range(0, len(forms), 500):
+        chunk = forms[i:i + 500]
+        known.update(a for (a,) in db.session.query(CompanionRule.plant_a).filter(CompanionRule.plant_a.in_(chunk)).distinct())
+        known.update(b for (b,) in db.session.query(CompanionRule.plant_b).filter(CompanionRule.plant_b.in_(chunk)).distinct())
+    return known
+
+
+def companions_for(plant_name):
+    """{'good': [...], 'avoid': [...]} for one plant, or None if no rules apply."""
+    key = _companion_key(plant_name, _known_companion_names([plant_name]))
+    if key is None:
+        return None
+    result = {'good': [], 'avoid': []}
+    for other, rel in sorted(_companion_pairs([key]).get(key, {}).items()):
+        result.setdefault(rel, []).append(other.title())
+    return result
+
+
+def scan_companion_conflicts():
+    """Find 'avoid' pairs growing in the same location across all active plants.
+
+    Plants are hash-grouped by normalized location, each distinct name is
+    resolved to a rule key once, and only the avoid rules touching names
+    present in the garden are loaded.
+    """
+    rows = (db.session.query(GardenPlant.id, GardenPlant.plant_name, GardenPlant.location)
+            .filter(GardenPlant.status == 'active', GardenPlant.location.isnot(None))
+            .all())
+    names = {name for _, name, _ in rows}
+    known = _known_companion_names(names)
+    keys = {name: _companion_key(name, known) for name in names}
+    avoid = _companion_pairs({k for k in keys.values() if k}, relation='avoid')
+
+    beds = {}
+    for pid, name, location in rows:
+        key = keys[name]
+        loc = ' '.join(location.lower().split())
+        if not key or not loc:
+            continue
+        bed = beds.setdefault(loc, {'location': location.strip(), 'plants': {}})
+        bed['plants'].setdefault(key, []).append(pid)
+
+    conflicts = []
+    for bed in beds.values():
+        present = bed['plants']
+        for key in present:
+            for other in avoid.get(key, {}).keys() & present.keys():
+                if key < other:
+                    conflicts.append({
+                        'location': bed['location'],
+                        'plant_a': key,
+                        'plant_b': other,
+                        'plant_a_ids': present[key],
+                        'plant_b_ids': present[other],
+                    })
+    conflicts.sort(key=lambda c: (c['location'].lower(), c['plant_a'], c['plant_b']))
+    return conflicts
+
+
+@app.route('/logbook/companions')
+def companion_report():
+    start = time.perf_counter()
+    conflicts = scan_companion_conflicts()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return render_template('logbook_companions.html', conflicts=conflicts, elapsed_ms=elapsed_ms)
+
+
+@app.route('/api/companions/conflicts')
+def companion_conflicts_api():
+    conflicts = scan_companion_conflicts()
+    return jsonify({'conflicts': conflicts, 'count': len(conflicts)})
+
+
+@app.cli.command('import-companions')
+@click.argument('csv_file', type=click.File('r'))
+def import_companions(csv_file):
+    """Load companion rules from a CSV with plant_a,plant_b,relation[,notes] columns."""
+    existing = {(r.plant_a, r.plant_b): r for r in CompanionRule.query.all()}
+    added = updated = skipped = 0
+    for row in csv.DictReader(csv_file):
+        a, b = normalize_plant_name(row.get('plant_a')), normalize_plant_name(row.get('plant_b'))
+        relation = (row.get('relation') or '').strip().lower()
+        if not a or not b or a == b or relation not in ('good', 'avoid'):
+            skipped += 1
+            continue
+        a, b = sorted((a, b))
+        rule = existing.get((a, b))
+        if rule is None:
+            rule = existing[(a, b)] = CompanionRule(plant_a=a, plant_b=b)
+            db.session.add(rule)
+            added += 1
+        else:
+            updated += 1
+        rule.relation = relation
+        rule.notes = (row.get('notes') or '').strip() or None
+    db.session.commit()
+    click.echo(f'{added} added, {updated} updated, {skipped} skipped.')
+
+
+# Starter rules (the pairs the detail page used to hard-code). Migration 010
+# seeds them, and so does startup for databases built by create_all.
+COMPANION_SEED = [
+    ('tomato', 'basil', 'good'), ('tomato', 'marigold', 'good'), ('tomato', 'chives', 'good'),
+    ('tomato', 'carrot', 'good'), ('tomato', 'fennel', 'avoid'), ('tomato', 'cabbage', 'avoid'),
+    ('cucumber', 'dill', 'good'), ('cucumber', 'nasturtium', 'good'), ('cucumber', 'radish', 'good'),
+    ('cucumber', 'potato', 'avoid'), ('cucumber', 'sage', 'avoid'),
+    ('pepper', 'basil', 'good'), ('pepper', 'onion', 'good'), ('pepper', 'spinach', 'good'),
+    ('pepper', 'fennel', 'avoid'),
+]
+
+
+def seed_companion_rules():
+    """Fill an empty companion_rules table with COMPANION_SEED; returns rows added."""
+    if db.session.query(CompanionRule.id).first() is not None:
+        return 0
+    for a, b, relation in COMPANION_SEED:
+        db.session.add(CompanionRule(plant_a=min(a, b), plant_b=max(a, b), relation=relation))
     try:
-        db.create_all()
+        db.session.commit()
+    except IntegrityError:  # another worker seeded them first
+        db.session.rollback()
+        return 0
+    return len(COMPANION_SEED)
+
+
+if app.config['AUTO_CREATE_TABLES']:
+    with app.app_context():
+        try:
+            seed_companion_rules()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warning: could not seed companion rules: {e}")
+
+
+# ---- Background jobs ----
+# Periodic batch work runs outside requests. Each job has a row in
+# scheduled_jobs; whichever process first claims a due row with a conditional
+# UPDATE runs it, so the runner thread in every gunicorn worker (or a separate
+# `flask run-jobs` process) can poll safely. Locks expire after JOB_LOCK_TIMEOUT
+# in case a worker dies mid-run. Failures retry with exponential backoff up to
+# the job's retry limit, then wait for the next scheduled time.
+
+JOBS = {}  # name -> {'func', 'schedule', 'retries'}
+CRON_ALIASES = {'@hourly': '0 * * * *', '@daily': '0 0 * * *', '@weekly': '0 0 * * 0', '@monthly': '0 0 1 * *'}
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}'
+_job_runner = {'thread': None}
+_job_runner_lock = threading.Lock()
+
+
+def scheduled_job(name, schedule, retries=2):
+    """Register a function as a background job on a cron schedule (UTC)."""
+    parse_cron(schedule)
+
+    def decorator(func):
+        JOBS[name] = {'func': func, 'schedule': schedule, 'retries': retries}
+        return func
+    return decorator
+
+
+def parse_cron(expr):
+    """Parse a five-field cron expression into sets of allowed values."""
+    fields = CRON_ALIASES.get(expr.strip(), expr).split()
+    if len(fields) != 5:
+        raise ValueError(f'Cron expression needs 5 fields: {expr!r}')
+    parsed = []
+    for field, (low, high) in zip(fields, CRON_FIELDS):
+        values = set()
+        for part in field.split(','):
+            rng, _, step = part.partition('/')
+            if rng == '*':
+                start, end = low, high
+            elif '-' in rng:
+                start, end = (int(v) for v in rng.split('-', 1))
+            else:
+                start = end = int(rng)
+                if step:
+                    end = high
+            if not (low <= start <= end <= high):
+                raise ValueError(f'Cron field out of range: {part!r} in {expr!r}')
+            values.update(range(start, end + 1, int(step) if step else 1))
+        parsed.append(values)
+    dow = parsed[4]
+    if 7 in dow:
+        dow.add(0)
+    # cron matches day-of-month OR day-of-week when both are restricted
+    parsed.append((fields[2] != '*', fields[4] != '*'))
+    return parsed
+
+
+def cron_next(expr, after):
+    """Next datetime strictly after `after` matching the cron expression."""
+    minutes, hours, days, months, weekdays, (dom_set, dow_set) = parse_cron(expr)
+    t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = after + timedelta(days=366 * 5)
+    while t <= limit:
+        if t.month not in months:
+            t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            continue
+        dom_ok, dow_ok = t.day in days, (t.weekday() + 1) % 7 in weekdays
+        day_ok = (dom_ok or dow_ok) if dom_set and dow_set else (dom_ok and dow_ok)
+        if not day_ok:
+            t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            continue
+        if t.hour not in hours:
+            t = t.replace(minute=0) + timedelta(hours=1)
+            continue
+        if t.minute not in minutes:
+            t += timedelta(minutes=1)
+            continue
+        return t
+    raise ValueError(f'Cron expression never matches: {expr!r}')
+
+
+def _ensure_job_rows():
+    """Create rows for newly registered jobs and pick up changed schedules.
+
+    New jobs are due immediately so their first run does not wait a day.
+    """
+    now = datetime.utcnow()
+    rows = {job.name: job for job in ScheduledJob.query.filter(ScheduledJob.name.in_(list(JOBS))).all()}
+    for name, spec in JOBS.items():
+        row = rows.get(name)
+        if row is None:
+            db.session.add(ScheduledJob(name=name, schedule=spec['schedule'], next_run_at=now))
+        elif row.schedule != spec['schedule']:
+            row.schedule = spec['schedule']
+            row.next_run_at = cron_next(spec['schedule'], now)
+    try:
+        db.session.commit()
+    except IntegrityError:  # another worker registered them first
+        db.session.rollback()
+
+
+def _claim_job(name, force=False):
+    """Atomically take the job's lock; True if this process now owns the run."""
+    now = datetime.utcnow()
+    table = ScheduledJob.__table__
+    conditions = [table.c.name == name, or_(table.c.locked_until.is_(None), table.c.locked_until < now)]
+    if not force:
+        conditions.append(table.c.next_run_at <= now)
+    result = db.session.execute(table.update().where(*conditions).values(
+        locked_by=WORKER_ID,
+        locked_until=now + timedelta(seconds=app.config['JOB_LOCK_TIMEOUT']),
+        last_started_at=now,
+    ))
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def run_job(name, force=False):
+    """Run one job if it is due and unclaimed. Returns its status, or None if skipped."""
+    spec = JOBS[name]
+    if not _claim_job(name, force=force):
+        return None
+    start = time.perf_counter()
+    error = None
+    try:
+        spec['func']()
+        db.session.commit()
     except Exception as e:
-        # Avoid crashing the app if DB user has no DDL privileges
-        print(f"Warning: could not create tables automatically: {e}")
+        db.session.rollback()
+        # Only the class and message are stored (and shown on /dashboard/jobs); the traceback goes to the log
+        error = f'{type(e).__name__}: {e}'
+        app.logger.exception('Job %s failed', name)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    now = datetime.utcnow()
+    job = db.session.get(ScheduledJob, name)
+    if job.locked_by != WORKER_ID:
+        app.logger.warning('Job %s lock was taken over during the run (took %.0f ms)', name, elapsed_ms)
+    job.locked_by = None
+    job.locked_until = None
+    job.last_finished_at = now
+    job.last_duration_ms = elapsed_ms
+    job.max_duration_ms = max(job.max_duration_ms or 0, elapsed_ms)
+    job.total_duration_ms = (job.total_duration_ms or 0) + elapsed_ms
+    job.run_count = (job.run_count or 0) + 1
+    if error is None:
+        job.last_status = 'ok'
+        job.last_error = None
+        job.attempts = 0
+        job.next_run_at = cron_next(job.schedule, now)
+    else:
+        job.failure_count = (job.failure_count or 0) + 1
+        job.last_error = error[-4000:]
+        job.attempts = (job.attempts or 0) + 1
+        if job.attempts <= spec['retries']:
+            job.last_status = 'retrying'
+            job.next_run_at = now + timedelta(seconds=app.config['JOB_RETRY_DELAY'] * 2 ** (job.attempts - 1))
+        else:
+            job.last_status = 'failed'
+            job.attempts = 0
+            job.next_run_at = cron_next(job.schedule, now)
+    db.session.commit()
+    return job.last_status
+
+
+def run_due_jobs():
+    """Run every job whose next_run_at has passed; returns {name: status}."""
+    _ensure_job_rows()
+    now = datetime.utcnow()
+    rows = (db.session.query(ScheduledJob.name, ScheduledJob.next_run_at)
+            .filter(ScheduledJob.next_run_at <= now, ScheduledJob.name.in_(list(JOBS))).all())
+    db.session.commit()
+    # Jobs due at the same moment run in registration order (due dates before the digest)
+    order = list(JOBS)
+    due = [name for name, _ in sorted(rows, key=lambda r: (r[1], order.index(r[0])))]
+    results = {}
+    for name in due:
+        status = run_job(name)
+        if status is not None:
+            results[name] = status
+    return results
+
+
+def _job_runner_loop():
+    interval = app.config['JOB_POLL_INTERVAL']
+    time.sleep(random.uniform(0, interval))  # spread the workers' polls
+    while True:
+        try:
+            with app.app_context():
+                run_due_jobs()
+        except Exception:
+            app.logger.exception('Background job runner tick failed')
+        time.sleep(interval)
+
+
+@app.before_request
+def _start_job_runner():
+    """Start the polling thread in this worker on its first request (JOB_RUNNER=thread)."""
+    if app.config['JOB_RUNNER'] != 'thread' or _job_runner['thread'] is not None:
+        return
+    with _job_runner_lock:
+        if _job_runner['thread'] is None:
+            _job_runner['thread'] = threading.Thread(target=_job_runner_loop, name='job-runner', daemon=True)
+            _job_runner['thread'].start()
+
+
+@app.cli.command('run-jobs')
+@click.option('--once', is_flag=True, help='Run whatever is due and exit instead of polling.')
+def run_jobs_command(once):
+    """Run due background jobs (a separate worker; set JOB_RUNNER=off on web processes)."""
+    while True:
+        for name, status in run_due_jobs().items():
+            click.echo(f'{name}: {status}')
+        if once:
+            return
+        time.sleep(app.config['JOB_POLL_INTERVAL'])
+
+
+@app.cli.command('run-job')
+@click.argument('name')
+def run_job_command(name):
+    """Run one job now, regardless of its schedule."""
+    if name not in JOBS:
+        raise click.ClickException(f'Unknown job {name!r}; known jobs: {", ".join(sorted(JOBS))}')
+    _ensure_job_rows()
+    status = run_job(name, force=True)
+    if status is None:
+        raise click.ClickException(f'{name} is already running elsewhere.')
+    click.echo(f'{name}: {status}')
+    if status != 'ok':
+        click.echo(db.session.get(ScheduledJob, name).last_error, err=True)
+
+
+@app.route('/dashboard/jobs')
+def job_stats():
+    """Schedules, locks and run-duration metrics for background jobs."""
+    jobs = []
+    for job in ScheduledJob.query.order_by(ScheduledJob.name).all():
+        row = _sync_dict(job)
+        row['avg_duration_ms'] = job.total_duration_ms / job.run_count if job.run_count else None
+        row['registered'] = job.name in JOBS
+        jobs.append(row)
+    return jsonify({'worker': WORKER_ID, 'runner': app.config['JOB_RUNNER'], 'jobs': jobs})
+
+
+@scheduled_job('recompute-due-dates', '15 2 * * *')
+def recompute_due_dates():
+    """Recompute active plants' last care and next due dates from history.
+
+    Harvested/removed plants are left alone so the job never touches their
+    updated_at/change_seq (which would re-sync them nightly and keep them
+    from ever becoming archive candidates).
+    """
+    ids = [pid for (pid,) in db.session.query(GardenPlant.id)
+           .filter(GardenPlant.status == 'active').order_by(GardenPlant.id)]
+    changed = 0
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        computed = _compute_last_care(chunk)
+        for plant in GardenPlant.query.filter(GardenPlant.id.in_(chunk)):
+            values = computed.get(plant.id, {})
+            for last_field, _, _ in CARE_SCHEDULE.values():
+                if getattr(plant, last_field) != values.get(last_field):
+                    setattr(plant, last_field, values.get(last_field))
+            _apply_due_dates(plant)
+            if db.session.is_modified(plant):
+                changed += 1
+        db.session.commit()
+    app.logger.info('recompute-due-dates: %d of %d plants changed', changed, len(ids))
+
+
+@scheduled_job('care-digest', '30 5 * * *')
+def build_care_digest():
+    """Summarize today's due care and last week's pest reports for the logbook."""
+    today = datetime.utcnow().date()
+    active = GardenPlant.query.filter(GardenPlant.status == 'active')
+
+    def _entry(p, due):
+        return {'id': p.id, 'name': p.nickname or p.plant_name, 'location': p.location, 'due': due.isoformat()}
+
+    # No stored date means no care or planting date yet: due now
+    water = (active.filter(or_(GardenPlant.next_water_date.is_(None), GardenPlant.next_water_date <= today))
+             .order_by(GardenPlant.next_water_date).all())
+    fertilize = (active.filter(or_(GardenPlant.next_fertilize_date.is_(None), GardenPlant.next_fertilize_date <= today))
+                 .order_by(GardenPlant.next_fertilize_date).all())
+    water_soon = active.filter(GardenPlant.next_water_date == today + timedelta(days=1)).count()
+    care_counts = dict(db.session.query(func.lower(CareEvent.type), func.count(CareEvent.id))
+                       .filter(CareEvent.date >= today - timedelta(days=1))
+                       .group_by(func.lower(CareEvent.type)).all())
+    alerts = (db.session.query(Observation, GardenPlant)
+              .join(GardenPlant, Observation.plant_id == GardenPlant.id)
+              .filter(GardenPlant.status == 'active', Observation.date >= today - timedelta(days=7),
+                      or_(and_(Observation.pests.isnot(None), Observation.pests != ''),
+                          and_(Observation.diseases.isnot(None), Observation.diseases != '')))
+              .order_by(Observation.date.desc()).limit(50).all())
+
+    payload = {
+        'generated_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'water_due': [_entry(p, p.next_water_date or today) for p in water],
+        'fertilize_due': [_entry(p, p.next_fertilize_date or today) for p in fertilize],
+        'water_soon_count': water_soon,
+        'care_last_day': care_counts,
+        'pest_alerts': [{'id': p.id, 'name': p.nickname or p.plant_name, 'date': o.date.isoformat(),
+                         'pests': o.pests, 'diseases': o.diseases} for o, p in alerts],
+    }
+    digest = db.session.get(CareDigest, today) or CareDigest(digest_date=today)
+    digest.payload = json.dumps(payload)
+    db.session.add(digest)
+    # Keep a month of digests
+    CareDigest.query.filter(CareDigest.digest_date < today - timedelta(days=31)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def latest_care_digest():
+    digest = CareDigest.query.order_by(CareDigest.digest_date.desc()).first()
+    if digest is None:
+        return None
+    data = json.loads(digest.payload)
+    data['date'] = digest.digest_date
+    return data
+
+
+# ---- Fragment cache ----
+# Per-entity template blocks are wrapped in {% call fragment(name, *key) %}.
+# Keys carry a version stamp (GardenPlant.cache_version, change_seq,
+# updated_at) so a changed entity simply misses; stale entries age out of
+# the per-process LRU.
+
+_fragments = OrderedDict()
+_fragment_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'uncacheable': 0}
+_fragment_lock = threading.Lock()
+
+
+@app.template_global()
+def fragment(name, *key, caller):
+    """Return the cached rendering of the call block for (name, *key), rendering on a miss."""
+    cache_key = (name, *key)
+    with _fragment_lock:
+        html = _fragments.get(cache_key)
+        if html is not None:
+            _fragments.move_to_end(cache_key)
+            _fragment_stats['hits'] += 1
+            return html
+        _fragment_stats['misses'] += 1
+    if has_request_context():
+        g.fragment_uncacheable = False
+    html = Markup(caller())
+    if has_request_context() and g.pop('fragment_uncacheable', False):
+        with _fragment_lock:
+            _fragment_stats['uncacheable'] += 1
+        return html
+    with _fragment_lock:
+        _fragments[cache_key] = html
+        while len(_fragments) > app.config['FRAGMENT_CACHE_SIZE']:
+            _fragments.popitem(last=False)
+            _fragment_stats['evictions'] += 1
+    return html
+
+
+def _bump_plant_cache_versions(session, plant_ids):
+    """Invalidate cached logbook cards for these plants.
+
+    A Core UPDATE rather than an attribute change, so the plant row is not
+    re-sent by the sync feed just because a child row changed. updated_at is
+    set to itself to keep its onupdate from firing, since sync clients and
+    the archival inactivity cutoff read it.
+    """
+    plant_ids = {pid for pid in plant_ids if pid is not None}
+    if not plant_ids:
+        return
+    table = GardenPlant.__table__
+    session.connection().execute(
+        table.update().where(table.c.id.in_(plant_ids))
+        .values(cache_version=table.c.cache_version + 1, updated_at=table.c.updated_at))
+    for obj in session.identity_map.values():
+        if isinstance(obj, GardenPlant) and obj.id in plant_ids:
+            session.expire(obj, ['cache_version'])
+
+
+@event.listens_for(Session, 'before_flush')
+def _invalidate_plant_fragments(session, flush_context, instances):
+    plant_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, GardenPlant):
+            if obj not in session.new and obj not in session.deleted:
+                plant_ids.add(obj.id)
+        elif isinstance(obj, tuple(ARCHIVE_EVENT_MODELS.values())):
+            plant_ids.add(obj.plant_id)
+    _bump_plant_cache_versions(session, plant_ids)
+
+
+@app.route('/dashboard/cache-stats')
+def cache_stats():
+    """Per-process cache counters (each gunicorn worker has its own)."""
+    with _fragment_lock:
+        fragments = dict(_fragment_stats, size=len(_fragments), max_size=app.config['FRAGMENT_CACHE_SIZE'])
+    snapshot = _catalog['snapshot']
+    return jsonify({
+        'pid': os.getpid(),
+        'fragments': fragments,
+        'catalog_version': snapshot.version if snapshot else None,
+    })
+
+
+# ---- Static assets ----
+# `flask build-assets` compiles Tailwind/DaisyUI (purged against the templates),
+# appends sophie.css, and writes a minified, content-hashed bundle plus a .gz
+# variant to static/dist/ with a manifest. Without a build, base.html falls
+# back to the CDN stylesheets so development works with no Node toolchain.
+
+ASSET_DIST_DIR = 'dist'
+ASSET_MANIFEST = 'manifest.json'
+ASSET_MAX_AGE = 365 * 24 * 3600
+_asset_manifest = None
+_asset_hashes = {}
+
+
+def _load_asset_manifest():
+    global _asset_manifest
+    if _asset_manifest is None or app.debug:
+        path = os.path.join(app.static_folder, ASSET_DIST_DIR, ASSET_MANIFEST)
+        try:
+            with open(path) as fh:
+                _asset_manifest = json.load(fh)
+        except (OSError, ValueError):
+            _asset_manifest = {}
+    return _asset_manifest
+
+
+def _static_file_hash(filename):
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _asset_hashes.get(filename)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as fh:
+        digest = hashlib.sha256(fh.read()).hexdigest()[:12]
+    _asset_hashes[filename] = (mtime, digest)
+    return digest
+
+
+@app.template_global()
+def asset_built(name):
+    return name in _load_asset_manifest()
+
+
+@app.template_global()
+def asset_url(filename, **values):
+    """Like url_for('static', ...), but returns a fingerprinted URL.
+
+    Built bundles resolve through the manifest to their hashed filename;
+    any other static file gets a `v=<content hash>` query parameter.
+    """
+    built = _load_asset_manifest().get(filename)
+    if built:
+        return url_for('static', filename=built, **values)
+    digest = _static_file_hash(filename)
+    if digest:
+        values['v'] = digest
+    return url_for('static', filename=filename, **values)
+
+
+def _minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};:,>])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+@app.cli.command('build-assets')
+@click.option('--tailwind', 'tailwind_cmd', default='npx tailwindcss', show_default=True,
+              help='Command used to run the Tailwind CLI.')
+def build_assets(tailwind_cmd):
+    """Build the purged, minified, fingerprinted CSS bundle into static/dist/."""
+    root = os.path.dirname(app.root_path)
+    dist = os.path.join(app.static_folder, ASSET_DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    tmp_out = os.path.join(dist, '.tailwind.css')
+    cmd = tailwind_cmd.split() + [
+        '-c', os.path.join(root, 'tailwind.config.js'),
+        '-i', os.path.join(app.static_folder, 'css', 'tailwind.css'),
+        '-o', tmp_out,
+        '--minify',
+    ]
+    try:
+        subprocess.run(cmd, cwd=root, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise click.ClickException(f'Tailwind build failed: {e}')
+    with open(tmp_out) as fh:
+        css = fh.read()
+    os.remove(tmp_out)
+    with open(os.path.join(app.static_folder, 'css', 'sophie.css')) as fh:
+        css += '\n' + _minify_css(fh.read())
+
+    data = css.encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    name = f'app.{digest}.css'
+    for old in os.listdir(dist):
+        if old.startswith('app.') and old.endswith(('.css', '.css.gz')):
+            os.remove(os.path.join(dist, old))
+    with open(os.path.join(dist, name), 'wb') as fh:
+        fh.write(data)
+    with open(os.path.join(dist, name + '.gz'), 'wb') as fh:
+        fh.write(gzip.compress(data, compresslevel=9, mtime=0))
+    with open(os.path.join(dist, ASSET_MANIFEST), 'w') as fh:
+        json.dump({'app.css': f'{ASSET_DIST_DIR}/{name}'}, fh, indent=2)
+    click.echo(f'Wrote {ASSET_DIST_DIR}/{name} ({len(data)} bytes, '
+               f'{os.path.getsize(os.path.join(dist, name + ".gz"))} gzipped)')
+
+
+@app.route('/static/dist/<path:filename>')
+def static_dist(filename):
+    """Serve built bundles, preferring the precompressed .gz variant."""
+    dist = os.path.join(app.static_folder, ASSET_DIST_DIR)
+    if filename == ASSET_MANIFEST:
+        abort(404)
+    if request.accept_encodings['gzip'] and os.path.isfile(os.path.join(dist, filename + '.gz')):
+        response = send_from_directory(dist, filename + '.gz', max_age=ASSET_MAX_AGE,
+                                       mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_from_directory(dist, filename, max_age=ASSET_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@app.after_request
+def _static_cache_headers(response):
+    # Fingerprinted (?v=) static URLs never change content, so cache them forever
+    if request.endpoint == 'static' and request.args.get('v') and response.status_code == 200:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+# ---- Response compression ----
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/xml',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+
+
+def _compress_body(data, encoding):
+    if encoding == 'br':
+        # Quality 5 is close to gzip's speed with noticeably smaller output
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=app.config['COMPRESS_LEVEL'])
+
+
+@app.after_request
+def _compress_response(response):
+    """Compress dynamic text responses (brotli when installed, else gzip)."""
+    if (request.method == 'HEAD'
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'no-transform' in (response.headers.get('Cache-Control') or '')):
+        return response
+    response.vary.add('Accept-Encoding')
+    if brotli is not None and request.accept_encodings['br']:
+        encoding = 'br'
+    elif request.accept_encodings['gzip']:
+        encoding = 'gzip'
+    else:
+        return response
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+    response.set_data(_compress_body(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    if response.get_etag()[0]:
+        response.set_etag(response.get_etag()[0], weak=True)
+    return response
+
+
+@app.cli.command('compile-templates')
+def compile_templates():
+    """Precompile every template into the Jinja bytecode cache (build step)."""
+    start = time.perf_counter()
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    click.echo(f'Compiled {len(names)} template(s) into {app.config["JINJA_CACHE_DIR"]} '
+               f'in {(time.perf_counter() - start) * 1000:.1f} ms.')
+
+
+@app.cli.command('measure-pages')
+@click.argument('paths', nargs=-1)
+def measure_pages(paths):
+    """Report bytes on the wire per encoding and first/warm render time.
+
+    "first" clears the in-process template cache, so it measures what a fresh
+    worker pays (served from the bytecode cache if it has been populated).
+    """
+    paths = paths or ('/', '/plants', '/blog', '/logbook', '/dashboard')
+    client = app.test_client()
+    click.echo(f"{'path':<24}{'identity':>10}{'gzip':>10}{'br':>10}{'first ms':>10}{'warm ms':>10}")
+    for path in paths:
+        app.jinja_env.cache.clear()
+        start = time.perf_counter()
+        raw = client.get(path, headers={'Accept-Encoding': 'identity'})
+        first_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        client.get(path, headers={'Accept-Encoding': 'identity'})
+        warm_ms = (time.perf_counter() - start) * 1000
+        sizes = [len(raw.data)]
+        for enc in ('gzip', 'br'):
+            r = client.get(path, headers={'Accept-Encoding': enc})
+            sizes.append(len(r.data) if r.headers.get('Content-Encoding') == enc else None)
+        cols = ''.join(f"{(str(n) if n is not None else '-'):>10}" for n in sizes)
+        click.echo(f'{path:<24}{cols}{first_ms:>10.1f}{warm_ms:>10.1f}')
+
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+@app.cli.command('benchmark-servers')
+@click.argument('paths', nargs=-1)
+@click.option('--concurrency', default=128, show_default=True, help='Simultaneous clients.')
+@click.option('--duration', default=20.0, show_default=True, help='Seconds of load per server.')
+@click.option('--workers', default=4, show_default=True, help='Worker processes per server.')
+def benchmark_servers(paths, concurrency, duration, workers):
+    """Compare gunicorn sync workers with the ASGI mode (app/asgi.py) under load.
+
+    Starts each server on a local port against the configured database,
+    drives it with `concurrency` keep-alive clients cycling through PATHS,
+    and reports throughput and latency percentiles.
+    """
+    import asyncio
+    try:
+        import httpx
+    except ImportError:
+        raise click.ClickException('benchmark-servers needs httpx and the async extras: pip install -r requirements-async.txt')
+
+    paths = paths or ('/logbook', '/blog', '/api/sync/changes?since=0&limit=200')
+    servers = {
+        'sync (gunicorn)': ['-m', 'gunicorn', '--workers', str(workers), '--timeout', '120', '--bind', '127.0.0.1:{port}', 'app:app'],
+        'async (uvicorn)': ['-m', 'uvicorn', 'app.asgi:app', '--workers', str(workers), '--port', '{port}',
+                            '--log-level', 'warning', '--no-access-log'],
+    }
+    env = dict(os.environ, JOB_RUNNER='off', PYTHONUNBUFFERED='1')
+
+    async def drive(base):
+        latencies, errors = [], 0
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+            for path in paths:  # warm templates, caches and pools
+                await client.get(path)
+            stop = time.perf_counter() + duration
+
+            async def client_loop(i):
+                nonlocal errors
+                n = i
+                while time.perf_counter() < stop:
+                    start = time.perf_counter()
+                    try:
+                        r = await client.get(paths[n % len(paths)])
+                        if r.status_code != 200:
+                            errors += 1
+                    except httpx.HTTPError:
+                        errors += 1
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    n += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(client_loop(i) for i in range(concurrency)))
+            elapsed = time.perf_counter() - started
+        return latencies, errors, elapsed
+
+    click.echo(f"{concurrency} clients, {duration:.0f}s per server, {workers} workers, paths: {' '.join(paths)}")
+    click.echo(f"{'server':<18}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for name, args in servers.items():
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        proc = subprocess.Popen([sys.executable, *(a.format(port=port) for a in args)],
+                                cwd=os.path.dirname(app.root_path), env=env)
+        try:
+            base = f'http://127.0.0.1:{port}'
+            for _ in range(100):
+                try:
+                    httpx.get(base + '/', timeout=1)
+                    break
+                except httpx.HTTPError:
+                    time.sleep(0.2)
+            else:
+                raise click.ClickException(f'{name} did not start on port {port}')
+            latencies, errors, elapsed = asyncio.run(drive(base))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+        click.echo(f'{name:<18}{len(latencies):>10}{len(latencies) / elapsed:>10.1f}'
+                   f'{_percentile(latencies, 50):>10.1f}{_percentile(latencies, 95):>10.1f}'
+                   f'{_percentile(latencies, 99):>10.1f}{max(latencies, default=0):>10.1f}{errors:>8}')
+
+
+# ---- Photo uploads ----
+# Originals are stored under UPLOAD_FOLDER/originals/<sha256>.<ext> and the
+# row keeps its `/media/...` URL in the existing photo/image_url column, so
+# external URLs keep working. Resized WebP variants (<sha256>-<width>w.webp)
+# are generated by a background thread pool, never inside the request.
+
+PHOTO_EXTENSIONS = {'jpg', 'jpeg', 'png', 'webp', 'gif'}
+PHOTO_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}  # Pillow format -> stored extension
+PHOTO_WIDTHS = (160, 320, 640, 1280)
+MEDIA_MAX_AGE = 365 * 24 * 3600
+_thumbnail_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('THUMBNAIL_WORKERS', '2')),
+                                     thread_name_prefix='thumbnails')
+_thumbnail_pending = set()
+_thumbnail_lock = threading.Lock()
+
+
+def _media_dir(kind):
+    path = os.path.join(app.config['UPLOAD_FOLDER'], kind)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _variant_name(name, width):
+    return f"{name.rsplit('.', 1)[0]}-{width}w.webp"
+
+
+def _width_file(name):
+    return os.path.join(_media_dir('variants'), f"{name.rsplit('.', 1)[0]}.width")
+
+
+def _original_width(name):
+    """Pixel width of an upload as displayed (after EXIF rotation), or None if not yet recorded."""
+    try:
+        with open(_width_file(name)) as fh:
+            return int(fh.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, data):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _generate_variants(name, originals, variants):
+    try:
+        with Image.open(os.path.join(originals, name)) as im:
+            im = ImageOps.exif_transpose(im)
+            im = im.convert('RGBA' if im.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            # Recorded so the original can join the srcset at its real width
+            _write_atomic(_width_file(name), str(im.width).encode())
+            for width in PHOTO_WIDTHS:
+                target = os.path.join(variants, _variant_name(name, width))
+                if os.path.exists(target):
+                    continue
+                if width >= im.width and width != PHOTO_WIDTHS[0]:
+                    break  # never upscale; the original covers larger sizes
+                copy = im.copy()
+                copy.thumbnail((width, width * 4))
+                tmp = f'{target}.{os.getpid()}.tmp'
+                copy.save(tmp, 'WEBP', quality=80, method=4)
+                os.replace(tmp, target)
+    except Exception as e:
+        app.logger.warning('Thumbnail generation failed for %s: %s', name, e)
+    finally:
+        with _thumbnail_lock:
+            _thumbnail_pending.discard(name)
+
+
+def schedule_thumbnails(name):
+    """Queue variant generation for an uploaded original (no-op without Pillow)."""
+    if Image is None:
+        return None
+    with _thumbnail_lock:
+        if name in _thumbnail_pending:
+            return None
+        _thumbnail_pending.add(name)
+    return _thumbnail_pool.submit(_generate_variants, name, _media_dir('originals'), _media_dir('variants'))
+
+
+def save_uploaded_photo(file_storage):
+    """Store an uploaded photo content-addressed and return its /media URL.
+
+    Returns None if the file is not an accepted image type. With Pillow the
+    content is checked too, and the stored extension follows the real format,
+    so a renamed non-image is never served as an image.
+    """
+    ext = (file_storage.filename or '').rsplit('.', 1)[-1].lower()
+    if ext not in PHOTO_EXTENSIONS:
+        return None
+    if ext == 'jpeg':
+        ext = 'jpg'
+    data = file_storage.read()
+    if not data:
+        return None
+    if Image is not None:
+        try:
+            with Image.open(BytesIO(data)) as im:
+                im.verify()
+                ext = PHOTO_FORMATS.get(im.format)
+        except Exception:
+            return None
+        if ext is None:
+            return None
+    name = f'{hashlib.sha256(data).hexdigest()[:32]}.{ext}'
+    path = os.path.join(_media_dir('originals'), name)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    schedule_thumbnails(name)
+    return url_for('media', filename=name)
+
+
+def _photo_from_request(field, url_field):
+    """Return (url, error) for a form that accepts an upload or a URL."""
+    upload = request.files.get(field)
+    if upload and upload.filename:
+        url = save_uploaded_photo(upload)
+        if url is None:
+            return None, 'Unsupported photo type. Use JPG, PNG, WebP or GIF.'
+        return url, None
+    return (request.form.get(url_field) or '').strip() or None, None
+
+
+@app.route('/media/<path:filename>')
+def media(filename):
+    """Serve uploaded originals and their variants (content-addressed, immutable)."""
+    if filename.endswith('w.webp') and os.path.exists(os.path.join(_media_dir('variants'), filename)):
+        response = send_from_directory(_media_dir('variants'), filename, max_age=MEDIA_MAX_AGE)
+    else:
+        response = send_from_directory(_media_dir('originals'), filename, max_age=MEDIA_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}, immutable'
+    return response
+
+
+@app.template_global()
+def responsive_img(url, alt='', class_='', sizes='100vw'):
+    """Render a lazy-loading <img>, with a WebP srcset for uploaded photos."""
+    attrs = [f'src="{escape(url)}"', f'alt="{escape(alt)}"', f'class="{escape(class_)}"',
+             'loading="lazy"', 'decoding="async"']
+    prefix = url_for('media', filename='')
+    if url and url.startswith(prefix):
+        name = url[len(prefix):]
+        variants = _media_dir('variants')
+        widths = [w for w in PHOTO_WIDTHS if os.path.exists(os.path.join(variants, _variant_name(name, w)))]
+        srcset = [f"{url_for('media', filename=_variant_name(name, w))} {w}w" for w in widths]
+        original_width = _original_width(name)
+        if original_width is None and widths:
+            schedule_thumbnails(name)  # uploaded before widths were recorded; backfill
+        elif srcset and original_width > widths[-1]:
+            # Larger than every variant (e.g. an 800px photo tops out at 640w)
+            srcset.append(f'{url} {original_width}w')
+        if srcset:
+            attrs.append(f'srcset="{escape(", ".join(srcset))}"')
+            attrs.append(f'sizes="{escape(sizes)}"')
+        pending = Image is not None and (not srcset or name in _thumbnail_pending)
+        if pending and has_request_context():
+            # Variants may still be generating; don't cache markup without them
+            g.fragment_uncacheable = True
+    return Markup(f"<img {' '.join(attrs)}>")
+
+
+@app.cli.command('generate-thumbnails')
+def generate_thumbnails():
+    """Generate any missing variants for stored uploads."""
+    if Image is None:
+        raise click.ClickException('Pillow is not installed.')
+    originals, variants = _media_dir('originals'), _media_dir('variants')
+    names = [n for n in os.listdir(originals) if not n.endswith('.tmp')]
+    for name in names:
+        _thumbnail_pending.add(name)
+        _generate_variants(name, originals, variants)
+    click.echo(f'Processed {len(names)} upload(s).')
+
 
 @app.route('/')
 def index():
-    featured_plants = Plant.query.filter_by(in_stock=True).order_by(Plant.created_at.desc()).limit(6).all()
-    recent_posts = []
-    try:
-        recent_posts = BlogPost.query.filter_by(is_published=True).order_by(BlogPost.published_at.desc()).limit(3).all()
-    except Exception:
-        # If blog table isn't present yet, fail gracefully
-        recent_posts = []
-    return render_template('index.html', plants=featured_plants, posts=recent_posts)
+    catalog = get_catalog()
+    return render_template('index.html', plants=catalog.featured_plants, posts=catalog.posts[:3])
 
 @app.route('/about')
 def about():
@@ -167,21 +2368,16 @@ def contact():
 
     return render_template('contact.html')
 
-@app.route('/dashboard')
-def dashboard():
-    # Stats
-    total_plants = Plant.query.count()
-    in_stock_count = Plant.query.filter_by(in_stock=True).count()
-    categories_count = db.session.query(Plant.category).distinct().count()
-    total_messages = ContactMessage.query.count()
-    unread_count = ContactMessage.query.filter_by(is_read=False).count()
+MESSAGES_PER_PAGE = 50
+MESSAGE_BOXES = ('inbox', 'archived')
 
-    # Message search/filter
-    q_msg = (request.args.get('q_msg') or '').strip()
-    msg_query = ContactMessage.query
+
+def _message_query(q_msg, box):
+    """Contact messages in `box` matching the dashboard search."""
+    query = ContactMessage.query.filter(ContactMessage.is_archived == (box == 'archived'))
     if q_msg:
         like = f"%{q_msg}%"
-        msg_query = msg_query.filter(
+        query = query.filter(
             or_(
                 ContactMessage.name.ilike(like),
                 ContactMessage.email.ilike(like),
@@ -189,7 +2385,46 @@ def dashboard():
                 ContactMessage.message.ilike(like),
             )
         )
-    messages = msg_query.order_by(ContactMessage.created_at.desc()).limit(50).all()
+    return query
+
+
+@app.route('/dashboard')
+def dashboard():
+    # Stats
+    total_plants, in_stock_count = db.session.query(
+        func.count(Plant.id),
+        func.coalesce(func.sum(case((Plant.in_stock == True, 1), else_=0)), 0),
+    ).one()
+    categories_count = db.session.query(Plant.category).distinct().count()
+    total_messages = db.session.query(func.count(ContactMessage.id)).scalar()
+    # Equality on is_read lets the (is_read, created_at) index narrow to unread rows
+    unread_count = ContactMessage.query.filter(ContactMessage.is_read == False).count()
+
+    # Message search/filter, keyset-paginated on (created_at, id)
+    q_msg = (request.args.get('q_msg') or '').strip()
+    box = request.args.get('box') if request.args.get('box') in MESSAGE_BOXES else 'inbox'
+    msg_query = _message_query(q_msg, box)
+    before, before_id = request.args.get('before'), request.args.get('before_id', type=int)
+    if before and before_id:
+        try:
+            before_ts = datetime.fromisoformat(before)
+        except ValueError:
+            before_ts = None
+        if before_ts:
+            msg_query = msg_query.filter(or_(
+                ContactMessage.created_at < before_ts,
+                and_(ContactMessage.created_at == before_ts, ContactMessage.id < before_id),
+            ))
+    messages = (msg_query
+                .order_by(ContactMessage.created_at.desc(), ContactMessage.id.desc())
+                .limit(MESSAGES_PER_PAGE + 1)
+                .all())
+    next_cursor = None
+    if len(messages) > MESSAGES_PER_PAGE:
+        messages = messages[:MESSAGES_PER_PAGE]
+        last = messages[-1]
+        if last.created_at:
+            next_cursor = {'before': last.created_at.isoformat(), 'before_id': last.id}
 
     # Plant search/filter
     q_plant = (request.args.get('q_plant') or '').strip()
@@ -218,10 +2453,51 @@ def dashboard():
         total_messages=total_messages,
         unread_count=unread_count,
         q_msg=q_msg,
+        box=box,
+        next_cursor=next_cursor,
+        paged=bool(before),
         q_plant=q_plant,
         only_in_stock=only_in_stock,
     )
 
+
+@app.route('/dashboard/messages/bulk', methods=['POST'])
+def dashboard_bulk_messages():
+    """Apply one action to the selected messages, or to everything matching the search."""
+    action = request.form.get('action')
+    q_msg = (request.form.get('q_msg') or '').strip()
+    box = request.form.get('box') if request.form.get('box') in MESSAGE_BOXES else 'inbox'
+    back = redirect(url_for('dashboard', q_msg=q_msg or None, box=box if box != 'inbox' else None))
+
+    if request.form.get('scope') == 'filter':
+        query = _message_query(q_msg, box)
+    else:
+        ids = [int(i) for i in request.form.getlist('message_ids') if i.isdigit()]
+        if not ids:
+            flash('No messages selected.', 'error')
+            return back
+        query = ContactMessage.query.filter(ContactMessage.id.in_(ids))
+
+    if action == 'mark_read':
+        count = query.update({ContactMessage.is_read: True}, synchronize_session=False)
+        verb = 'marked as read'
+    elif action == 'archive':
+        count = query.update({ContactMessage.is_archived: True, ContactMessage.is_read: True},
+                             synchronize_session=False)
+        verb = 'archived'
+    elif action == 'unarchive':
+        count = query.update({ContactMessage.is_archived: False}, synchronize_session=False)
+        verb = 'moved to inbox'
+    elif action == 'delete':
+        count = query.delete(synchronize_session=False)
+        verb = 'deleted'
+    else:
+        flash('Unknown action.', 'error')
+        return back
+    db.session.commit()
+    flash(f'{count} message(s) {verb}.', 'success')
+    return back
+
 @app.route('/admin')
 def admin_legacy():
     return redirect(url_for('dashboard'))
@@ -244,26 +2520,22 @@ def dashboard_delete_message(message_id):
 
 @app.route('/plants')
 def plants():
-    category = (request.args.get('category', 'all') or 'all').lower()
-    query = Plant.query.filter_by(in_stock=True)
+    category = normalize_category(request.args.get('category', 'all') or 'all')
+    catalog = get_catalog()
     if category != 'all':
-        alias_map = {
-            'flower': ['flower', 'flowers'],
-            'fruit': ['fruit', 'fruits'],
-            'vegetable': ['vegetable', 'vegetables', 'veggies'],
-        }
-        aliases = alias_map.get(category, [category])
-        query = query.filter(func.lower(Plant.category).in_(aliases))
-    plants = query.all()
+        plants = catalog.plants_by_category.get(category, ())
+    else:
+        plants = catalog.plants
 
-    categories = db.session.query(Plant.category).distinct().all()
-    categories = [cat[0] for cat in categories]
-
-    return render_template('plants.html', plants=plants, categories=categories, current_category=category)
+    return render_template('plants.html', plants=plants, categories=list(catalog.category_counts),
+                           category_counts=catalog.category_counts,
+                           total_count=len(catalog.plants), current_category=category)
 
 @app.route('/plant/<int:plant_id>')
 def plant_detail(plant_id):
-    plant = Plant.query.get_or_404(plant_id)
+    plant = get_catalog().plants_by_id.get(plant_id)
+    if plant is None:
+        abort(404)
     return render_template('plant_detail.html', plant=plant)
 
 @app.route('/services')
@@ -280,32 +2552,30 @@ def blog():
     per_page = 6
     q = (request.args.get('q') or '').strip()
     tag = (request.args.get('tag') or '').strip()
+    catalog = get_catalog()
 
-    query = BlogPost.query.filter_by(is_published=True)
     if q:
+        # Full-text search needs post bodies, which the snapshot leaves out
+        query = BlogPost.query.filter_by(is_published=True)
         like = f"%{q}%"
         query = query.filter(or_(BlogPost.title.ilike(like),
                                  BlogPost.excerpt.ilike(like),
                                  BlogPost.content.ilike(like)))
-    if tag:
-        query = query.filter(BlogPost.tags.ilike(f"%{tag}%"))
-
-    pagination = (query
-                  .order_by(BlogPost.published_at.desc())
-                  .paginate(page=page, per_page=per_page, error_out=False))
+        if tag:
+            query = query.filter(BlogPost.tags.ilike(f"%{tag}%"))
+        pagination = (query
+                      .order_by(BlogPost.published_at.desc())
+                      .paginate(page=page, per_page=per_page, error_out=False))
+    else:
+        posts = catalog.posts
+        if tag:
+            needle = tag.lower()
+            posts = catalog.posts_by_tag.get(needle) or tuple(
+                p for p in catalog.posts if needle in (p.tags or '').lower())
+        pagination = ListPagination(page=page, per_page=per_page, error_out=False, items=posts)
     posts = pagination.items
 
-    # Build a simple tag cloud list (top 12 by frequency)
-    all_tags = {}
-    for p in BlogPost.query.filter_by(is_published=True).all():
-        for t in (p.tags or '').split(','):
-            t = t.strip()
-            if not t:
-                continue
-            all_tags[t] = all_tags.get(t, 0) + 1
-    tags = [t for t, _ in sorted(all_tags.items(), key=lambda kv: kv[1], reverse=True)[:12]]
-
-    return render_template('blog.html', posts=posts, pagination=pagination, q=q, tag=tag, tags=tags)
+    return render_template('blog.html', posts=posts, pagination=pagination, q=q, tag=tag, tags=list(catalog.top_tags))
 
 @app.route('/blog/<int:post_id>')
 def blog_detail(post_id):
@@ -344,50 +2614,37 @@ def blog_detail(post_id):
 @app.route('/logbook')
 def logbook():
     q = (request.args.get('q') or '').strip()
-    category = (request.args.get('category') or 'all').lower()
-    status = (request.args.get('status') or 'active').lower()
+    category = normalize_category(request.args.get('category') or 'all')
+    status = normalize_status(request.args.get('status') or 'active')
 
-    query = GardenPlant.query
+    search = []
     if q:
         like = f"%{q}%"
-        query = query.filter(or_(
+        search.append(or_(
             GardenPlant.plant_name.ilike(like),
             GardenPlant.nickname.ilike(like),
             GardenPlant.variety.ilike(like),
             GardenPlant.location.ilike(like),
         ))
+    query = GardenPlant.query.filter(*search)
     if category != 'all':
-        query = query.filter(func.lower(GardenPlant.category) == category)
+        query = query.filter(GardenPlant.category == category)
     if status != 'all':
-        query = query.filter(func.lower(GardenPlant.status) == status)
+        query = query.filter(GardenPlant.status == status)
 
     plants = query.order_by(GardenPlant.created_at.desc()).all()
 
-    # Compute watering schedule info per plant
+    # Watering schedule info per plant, from the stored care dates
     due_map = {}
     today = datetime.utcnow().date()
     for p in plants:
-        cat = (p.category or 'other').lower()
-        water_interval = {
-            'flower': 3,
-            'fruit': 2,
-            'vegetable': 2,
-            'herb': 2,
-            'tree': 4,
-            'other': 3,
-        }.get(cat, 3)
-        # last watering
-        dates = [ce.date for ce in (p.care_events or []) if ce.date and (ce.type or '').lower() == 'watering']
-        last_water = max(dates) if dates else None
-        next_water = (last_water + timedelta(days=water_interval)) if last_water else (today if p.planting_date is None else p.planting_date + timedelta(days=water_interval))
-        water_due = next_water <= today if next_water else False
-        water_soon = (next_water - today).days == 1 if next_water else False
+        next_water = p.next_water_date or today
         due_map[p.id] = {
             'next_water': next_water,
-            'last_water': last_water,
-            'water_due': water_due,
-            'water_soon': water_soon,
-            'water_interval_days': water_interval,
+            'last_water': p.last_watered_date,
+            'water_due': next_water <= today,
+            'water_soon': (next_water - today).days == 1,
+            'water_interval_days': WATER_INTERVALS.get((p.category or 'other').lower(), WATER_INTERVALS['other']),
         }
 
     totals = {
@@ -397,29 +2654,45 @@ def logbook():
         'harvests': db.session.query(func.count(Harvest.id)).scalar() or 0,
     }
 
-    categories = db.session.query(func.lower(GardenPlant.category)).distinct().all()
-    categories = [c[0] for c in categories]
-
-    return render_template('logbook.html', plants=plants, q=q, category=category, status=status, totals=totals, categories=categories, due_map=due_map)
+    # Category and status facets from one grouped query; each facet counts
+    # within the other filter's current selection.
+    category_counts, status_counts = {}, {}
+    grouped = (db.session.query(GardenPlant.category, GardenPlant.status, func.count(GardenPlant.id))
+               .filter(*search)
+               .group_by(GardenPlant.category, GardenPlant.status)
+               .all())
+    for cat, st, n in grouped:
+        if status == 'all' or st == status:
+            category_counts[cat] = category_counts.get(cat, 0) + n
+        if category == 'all' or cat == category:
+            status_counts[st] = status_counts.get(st, 0) + n
+    categories = sorted(c for c in {cat for cat, _, _ in grouped} if c)
+
+    return render_template('logbook.html', plants=plants, q=q, category=category, status=status, totals=totals,
+                           categories=categories, category_counts=category_counts, status_counts=status_counts,
+                           due_map=due_map, digest=latest_care_digest())
 
 
 @app.route('/logbook/new', methods=['GET', 'POST'])
 def logbook_new():
     if request.method == 'POST':
         plant_name = (request.form.get('plant_name') or '').strip()
-        category = (request.form.get('category') or '').strip().lower()
+        category = normalize_category(request.form.get('category'))
         nickname = (request.form.get('nickname') or '').strip()
         scientific_name = (request.form.get('scientific_name') or '').strip()
         variety = (request.form.get('variety') or '').strip()
         source = (request.form.get('source') or '').strip()
         planting_date_str = (request.form.get('planting_date') or '').strip()
         location = (request.form.get('location') or '').strip()
-        image_url = (request.form.get('image_url') or '').strip()
+        image_url, photo_error = _photo_from_request('image', 'image_url')
         notes = (request.form.get('notes') or '').strip()
 
         if not plant_name or not category:
             flash('Please provide at least the plant name and category.', 'error')
             return redirect(url_for('logbook_new'))
+        if photo_error:
+            flash(photo_error, 'error')
+            return redirect(url_for('logbook_new'))
 
         planting_date = None
         if planting_date_str:
@@ -451,11 +2724,7 @@ def logbook_new():
 
 @app.route('/logbook/<int:plant_id>')
 def logbook_detail(plant_id):
-    plant = GardenPlant.query.get_or_404(plant_id)
-
-    observations = Observation.query.filter_by(plant_id=plant.id).order_by(Observation.date.desc(), Observation.created_at.desc()).all()
-    care = CareEvent.query.filter_by(plant_id=plant.id).order_by(CareEvent.date.desc(), CareEvent.created_at.desc()).all()
-    harvests = Harvest.query.filter_by(plant_id=plant.id).order_by(Harvest.date.desc(), Harvest.created_at.desc()).all()
+    plant, observations, care, harvests, archived = load_plant_history(plant_id)
 
     # Build unified timeline sorted by date (desc)
     timeline = []
@@ -481,22 +2750,8 @@ def logbook_detail(plant_id):
 
     # Insights & schedules
     cat = (plant.category or 'other').lower()
-    WATER_INTERVAL = {
-        'flower': 3,
-        'fruit': 2,
-        'vegetable': 2,
-        'herb': 2,
-        'tree': 4,
-        'other': 3,
-    }.get(cat, 3)
-    FERT_INTERVAL = {
-        'flower': 14,
-        'fruit': 14,
-        'vegetable': 14,
-        'herb': 21,
-        'tree': 30,
-        'other': 14,
-    }.get(cat, 14)
+    WATER_INTERVAL = WATER_INTERVALS.get(cat, WATER_INTERVALS['other'])
+    FERT_INTERVAL = FERTILIZE_INTERVALS.get(cat, FERTILIZE_INTERVALS['other'])
 
     def _latest_date(events, predicate=lambda e: True):
         dts = [e.date for e in events if e.date and predicate(e)]
@@ -507,21 +2762,6 @@ def logbook_detail(plant_id):
     next_water = (last_water + timedelta(days=WATER_INTERVAL)) if last_water else (datetime.utcnow().date() if plant.planting_date is None else plant.planting_date + timedelta(days=WATER_INTERVAL))
     next_fert = (last_fert + timedelta(days=FERT_INTERVAL)) if last_fert else (datetime.utcnow().date() if plant.planting_date is None else plant.planting_date + timedelta(days=FERT_INTERVAL))
 
-    first_flower = None
-    first_fruit = None
-    if observations:
-        for o in sorted(observations, key=lambda x: (x.date or datetime.utcnow().date())):
-            if first_flower is None and o.flowers and o.flowers > 0:
-                first_flower = o.date
-            if first_fruit is None and o.fruits and o.fruits > 0:
-                first_fruit = o.date
-            if first_flower and first_fruit:
-                break
-
-    first_harvest = _latest_date(harvests, lambda h: True)
-    if harvests:
-        first_harvest = min([h.date for h in harvests if h.date]) if any(h.date for h in harvests) else None
-
     days_since_planting = (datetime.utcnow().date() - plant.planting_date).days if plant.planting_date else None
     days_since_water = (datetime.utcnow().date() - last_water).days if last_water else None
     days_since_fert = (datetime.utcnow().date() - last_fert).days if last_fert else None
@@ -538,23 +2778,7 @@ def logbook_detail(plant_id):
         if h.quantity is not None and h.unit:
             harvest_totals[h.unit] = harvest_totals.get(h.unit, 0.0) + float(h.quantity)
 
-    # Companion planting suggestions (simple mapping)
-    companions = {
-        'tomato': {
-            'good': ['Basil', 'Marigold', 'Chives', 'Carrot'],
-            'avoid': ['Fennel', 'Cabbage'],
-        },
-        'cucumber': {
-            'good': ['Dill', 'Nasturtium', 'Radish'],
-            'avoid': ['Potato', 'Sage'],
-        },
-        'pepper': {
-            'good': ['Basil', 'Onion', 'Spinach'],
-            'avoid': ['Fennel'],
-        },
-    }
-    pn = (plant.plant_name or '').strip().lower()
-    comp = companions.get(pn, None)
+    comp = companions_for(plant.plant_name)
 
     # Suggested actions
     suggestions = []
@@ -577,9 +2801,9 @@ def logbook_detail(plant_id):
             suggestions.append({'kind': 'pest', 'title': 'Inspect for pests/disease', 'severity': 'high'})
 
     insights = {
-        'first_flower': first_flower,
-        'first_fruit': first_fruit,
-        'first_harvest': first_harvest,
+        'first_flower': plant.first_flower_date,
+        'first_fruit': plant.first_fruit_date,
+        'first_harvest': plant.first_harvest_date,
         'days_since_planting': days_since_planting,
         'last_water': last_water,
         'next_water': next_water,
@@ -601,6 +2825,7 @@ def logbook_detail(plant_id):
         suggestions=suggestions,
         companions=comp,
         insights=insights,
+        archived=archived,
     )
 
 
@@ -614,9 +2839,13 @@ def add_observation(plant_id):
     fruits = request.form.get('fruits')
     pests = (request.form.get('pests') or '').strip() or None
     diseases = (request.form.get('diseases') or '').strip() or None
-    photo_url = (request.form.get('photo_url') or '').strip() or None
+    photo_url, photo_error = _photo_from_request('photo', 'photo_url')
     notes = (request.form.get('notes') or '').strip() or None
 
+    if photo_error:
+        flash(photo_error, 'error')
+        return redirect(url_for('logbook_detail', plant_id=plant.id))
+
     date = None
     if date_str:
         try:
@@ -684,11 +2913,14 @@ def add_harvest(plant_id):
     unit = (request.form.get('unit') or '').strip()
     quality = (request.form.get('quality') or '').strip() or None
     notes = (request.form.get('notes') or '').strip() or None
-    photo_url = (request.form.get('photo_url') or '').strip() or None
 
     if not quantity or not unit:
         flash('Please provide harvest quantity and unit.', 'error')
         return redirect(url_for('logbook_detail', plant_id=plant.id))
+    photo_url, photo_error = _photo_from_request('photo', 'photo_url')
+    if photo_error:
+        flash(photo_error, 'error')
+        return redirect(url_for('logbook_detail', plant_id=plant.id))
 
     date = None
     if date_str:
@@ -777,10 +3009,7 @@ def quick_fertilize_bulk():
 
 @app.route('/logbook/<int:plant_id>/export.csv')
 def export_log_csv(plant_id):
-    plant = GardenPlant.query.get_or_404(plant_id)
-    observations = Observation.query.filter_by(plant_id=plant.id).all()
-    care = CareEvent.query.filter_by(plant_id=plant.id).all()
-    harvests = Harvest.query.filter_by(plant_id=plant.id).all()
+    plant, observations, care, harvests, _ = load_plant_history(plant_id)
 
     output = StringIO()
     writer = csv.writer(output)
@@ -0,0 +1,155 @@
+"""ASGI entry point for the optional async deployment mode.
+
+    uvicorn app.asgi:app --workers 4
+
+GET/HEAD requests for the read-heavy endpoints in ASYNC_ENDPOINTS run the
+regular Flask views inside a SQLAlchemy greenlet bound to an async engine
+(aiosqlite for SQLite, aiomysql for MySQL). Every query a view, template or
+lazy relationship issues is awaited on the event loop, so one worker keeps
+many requests in flight while they wait on the database, and a slow client
+or long export no longer pins a whole worker. All other requests are handed
+to the Flask app unchanged through a2wsgi's thread pool.
+"""
+import asyncio
+from io import BytesIO
+import os
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+from . import app as flask_app, db, ROUTE_TIME_BUDGETS, _count_request_event, _request_stats, _request_stats_lock
+
+ASYNC_ENDPOINTS = {'logbook', 'blog', 'sync_changes', 'companion_conflicts_api', 'export_log_csv'}
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'mysql': 'mysql+aiomysql'}
+
+
+def async_database_url(url):
+    """Swap the sync driver in a database URL for its async counterpart."""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f'No async driver for {url.get_backend_name()!r}; set ASYNC_DATABASE_URL.')
+    return url.set(drivername=driver)
+
+
+flask_app.config['ASYNC_DATABASE_URL'] = (os.environ.get('ASYNC_DATABASE_URL')
+                                          or async_database_url(flask_app.config['SQLALCHEMY_DATABASE_URI']))
+flask_app.config['ASYNC_POOL_SIZE'] = int(os.environ.get('ASYNC_POOL_SIZE', '20'))
+flask_app.config['ASYNC_WSGI_THREADS'] = int(os.environ.get('ASYNC_WSGI_THREADS', '10'))
+flask_app.config['ASYNC_MAX_CONCURRENT_REQUESTS'] = int(os.environ.get('ASYNC_MAX_CONCURRENT_REQUESTS',
+                                                                       flask_app.config['ASYNC_POOL_SIZE']))
+flask_app.config['ASYNC_MAX_QUEUED_REQUESTS'] = int(os.environ.get('ASYNC_MAX_QUEUED_REQUESTS', '256'))
+
+async_engine = create_async_engine(
+    flask_app.config['ASYNC_DATABASE_URL'],
+    pool_size=flask_app.config['ASYNC_POOL_SIZE'],
+    max_overflow=flask_app.config['ASYNC_POOL_SIZE'] // 2,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+)
+AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+wsgi_app = WSGIMiddleware(flask_app, workers=flask_app.config['ASYNC_WSGI_THREADS'])
+
+# Per-process limit on async requests running at once. Views still render on
+# the one event-loop thread, so letting every open connection interleave only
+# stretches all of them; the rest wait in FIFO order (up to
+# ASYNC_MAX_QUEUED_REQUESTS, then 503). The semaphore is created on first use
+# so it belongs to the server's event loop.
+_slots = {'semaphore': None}
+
+
+def _dispatch(session, environ):
+    """Run Flask's full request cycle with db.session bound to `session` (in the greenlet)."""
+    ctx = flask_app.request_context(environ)
+    error = None
+    try:
+        ctx.push()
+        db.session.registry.set(session)
+        try:
+            response = flask_app.full_dispatch_request()
+        except Exception as e:
+            error = e
+            response = flask_app.handle_exception(e)
+        return response.status_code, response.headers.to_wsgi_list(), response.get_data()
+    finally:
+        ctx.pop(error)
+
+
+async def _acquire_slot(endpoint):
+    limit = flask_app.config['ASYNC_MAX_CONCURRENT_REQUESTS']
+    if not limit:
+        return True
+    if _slots['semaphore'] is None:
+        _slots['semaphore'] = asyncio.Semaphore(limit)
+    semaphore = _slots['semaphore']
+    with _request_stats_lock:
+        if semaphore.locked() and _request_stats['queued'] >= flask_app.config['ASYNC_MAX_QUEUED_REQUESTS']:
+            return False
+        _request_stats['queued'] += 1
+    budget = ROUTE_TIME_BUDGETS.get(endpoint, flask_app.config['REQUEST_TIME_BUDGET_MS']) / 1000
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=budget)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        with _request_stats_lock:
+            _request_stats['queued'] -= 1
+
+
+def _release_slot():
+    if flask_app.config['ASYNC_MAX_CONCURRENT_REQUESTS']:
+        _slots['semaphore'].release()
+
+
+async def _send(send, status, headers, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_engine.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+        return await wsgi_app(scope, receive, send)
+
+    environ = build_environ(scope, BytesIO())
+    environ['garden.async'] = True
+    try:
+        endpoint, _ = flask_app.url_map.bind_to_environ(environ).match()
+    except HTTPException:  # 404/405/redirects are Flask's to answer
+        endpoint = None
+    if endpoint not in ASYNC_ENDPOINTS:
+        return await wsgi_app(scope, receive, send)
+
+    if not await _acquire_slot(endpoint):
+        _count_request_event('shed', endpoint)
+        flask_app.logger.warning('Shedding GET %s: async queue full', scope['path'])
+        return await _send(send, 503, [
+            ('Content-Type', 'text/plain; charset=utf-8'),
+            ('Retry-After', str(flask_app.config['LOAD_SHED_RETRY_AFTER'])),
+        ], b'The garden is busy right now, please try again shortly.')
+    try:
+        async with AsyncSession() as session:
+            status, headers, body = await session.run_sync(_dispatch, environ)
+    finally:
+        _release_slot()
+    await _send(send, status, headers, b'' if scope['method'] == 'HEAD' else body)
@@ -8,6 +8,9 @@ import sys
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Importing the app must not create tables ahead of the migrations that add them
+os.environ['AUTO_CREATE_TABLES'] = '0'
+
 from app import db
 from app import ContactMessage, Plant
 from app import BlogPost, GardenPlant, Observation, CareEvent, Harvest
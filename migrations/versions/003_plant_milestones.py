@@ -0,0 +1,39 @@
+"""Persisted plant milestones
+
+Revision ID: 003_plant_milestones
+Revises: 002_garden_logbook
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_plant_milestones'
+down_revision = '002_garden_logbook'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('garden_plants', sa.Column('first_flower_date', sa.Date(), nullable=True))
+    op.add_column('garden_plants', sa.Column('first_fruit_date', sa.Date(), nullable=True))
+    op.add_column('garden_plants', sa.Column('first_harvest_date', sa.Date(), nullable=True))
+
+    # Backfill from existing history
+    op.execute("""
+        UPDATE garden_plants SET
+            first_flower_date = (SELECT MIN(o.date) FROM observations o
+                                 WHERE o.plant_id = garden_plants.id AND o.flowers > 0 AND o.date IS NOT NULL),
+            first_fruit_date = (SELECT MIN(o.date) FROM observations o
+                                WHERE o.plant_id = garden_plants.id AND o.fruits > 0 AND o.date IS NOT NULL),
+            first_harvest_date = (SELECT MIN(h.date) FROM harvests h
+                                  WHERE h.plant_id = garden_plants.id AND h.date IS NOT NULL)
+    """)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('garden_plants') as batch_op:
+        batch_op.drop_column('first_harvest_date')
+        batch_op.drop_column('first_fruit_date')
+        batch_op.drop_column('first_flower_date')
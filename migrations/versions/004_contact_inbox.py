@@ -0,0 +1,28 @@
+"""Contact inbox archiving and indexes
+
+Revision ID: 004_contact_inbox
+Revises: 003_plant_milestones
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_contact_inbox'
+down_revision = '003_plant_milestones'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('contact_messages', sa.Column('is_archived', sa.Boolean(), server_default='0', nullable=False))
+    op.create_index('ix_contact_messages_is_read_created_at', 'contact_messages', ['is_read', 'created_at'])
+    op.create_index('ix_contact_messages_is_archived_created_at', 'contact_messages', ['is_archived', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contact_messages_is_archived_created_at', table_name='contact_messages')
+    op.drop_index('ix_contact_messages_is_read_created_at', table_name='contact_messages')
+    with op.batch_alter_table('contact_messages') as batch_op:
+        batch_op.drop_column('is_archived')
@@ -0,0 +1,45 @@
+"""Normalize categories and index catalog/logbook filters
+
+Revision ID: 005_category_facets
+Revises: 004_contact_inbox
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_category_facets'
+down_revision = '004_contact_inbox'
+branch_labels = None
+depends_on = None
+
+# Mirrors app.CATEGORY_ALIASES at the time of this migration
+CATEGORY_ALIASES = {
+    'flowers': 'flower',
+    'fruits': 'fruit',
+    'vegetables': 'vegetable',
+    'veggies': 'vegetable',
+    'veggie': 'vegetable',
+    'herbs': 'herb',
+    'trees': 'tree',
+}
+
+
+def upgrade() -> None:
+    for table in ('plants', 'garden_plants'):
+        op.execute(f"UPDATE {table} SET category = LOWER(TRIM(category))")
+        for alias, canonical in CATEGORY_ALIASES.items():
+            op.execute(
+                sa.text(f"UPDATE {table} SET category = :canonical WHERE category = :alias")
+                .bindparams(canonical=canonical, alias=alias)
+            )
+    op.execute("UPDATE garden_plants SET status = LOWER(TRIM(status)) WHERE status IS NOT NULL")
+
+    op.create_index('ix_plants_in_stock_category', 'plants', ['in_stock', 'category'])
+    op.create_index('ix_garden_plants_status_category', 'garden_plants', ['status', 'category'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_garden_plants_status_category', table_name='garden_plants')
+    op.drop_index('ix_plants_in_stock_category', table_name='plants')
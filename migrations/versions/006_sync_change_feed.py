@@ -0,0 +1,68 @@
+"""Change sequence numbers and tombstones for the sync feed
+
+Revision ID: 006_sync_change_feed
+Revises: 005_category_facets
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_sync_change_feed'
+down_revision = '005_category_facets'
+branch_labels = None
+depends_on = None
+
+SYNC_TABLES = ('garden_plants', 'observations', 'care_events', 'harvests')
+
+
+def _has_table(name):
+    # Tables may already exist if the app's create_all ran against this database
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    for table in SYNC_TABLES:
+        # No server default: SQLite can't add a column with a non-constant one; backfilled below
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.add_column(table, sa.Column('change_seq', sa.BigInteger(), nullable=True))
+        op.create_index(f'ix_{table}_change_seq', table, ['change_seq'])
+
+    if not _has_table('sync_sequence'):
+        op.create_table(
+            'sync_sequence',
+            sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+            sa.Column('value', sa.BigInteger(), nullable=False),
+        )
+    if not _has_table('sync_tombstones'):
+        op.create_table(
+            'sync_tombstones',
+            sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+            sa.Column('entity', sa.String(length=30), nullable=False),
+            sa.Column('entity_id', sa.Integer(), nullable=False),
+            sa.Column('plant_id', sa.Integer(), nullable=True),
+            sa.Column('change_seq', sa.BigInteger(), nullable=False),
+            sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        )
+        op.create_index('ix_sync_tombstones_change_seq', 'sync_tombstones', ['change_seq'])
+
+    # Backfill: give existing rows distinct seqs, one id-ordered block per table
+    bind = op.get_bind()
+    offset = 0
+    for table in SYNC_TABLES:
+        op.execute(f"UPDATE {table} SET change_seq = id + {offset}, updated_at = created_at")
+        offset += bind.execute(sa.text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")).scalar()
+    op.execute("DELETE FROM sync_sequence")
+    op.execute(f"INSERT INTO sync_sequence (id, value) VALUES (1, {offset})")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sync_tombstones_change_seq', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+    op.drop_table('sync_sequence')
+    for table in SYNC_TABLES:
+        op.drop_index(f'ix_{table}_change_seq', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('change_seq')
+            batch_op.drop_column('updated_at')
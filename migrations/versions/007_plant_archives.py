@@ -0,0 +1,46 @@
+"""Cold storage for archived plants and old events
+
+Revision ID: 007_plant_archives
+Revises: 006_sync_change_feed
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_plant_archives'
+down_revision = '006_sync_change_feed'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # Tables may already exist if the app's create_all ran against this database
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    if not _has_table('plant_archives'):
+        op.create_table(
+            'plant_archives',
+            sa.Column('plant_id', sa.Integer(), primary_key=True, autoincrement=False, nullable=False),
+            sa.Column('plant', sa.Text(), nullable=True),
+            sa.Column('payload', sa.LargeBinary(length=2**24 - 1), nullable=False),
+            sa.Column('row_count', sa.Integer(), nullable=True),
+            sa.Column('first_flower_date', sa.Date(), nullable=True),
+            sa.Column('first_fruit_date', sa.Date(), nullable=True),
+            sa.Column('first_harvest_date', sa.Date(), nullable=True),
+            sa.Column('archived_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        )
+    # Archival scans events by age
+    op.create_index('ix_observations_date', 'observations', ['date'])
+    op.create_index('ix_care_events_date', 'care_events', ['date'])
+    op.create_index('ix_harvests_date', 'harvests', ['date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_harvests_date', table_name='harvests')
+    op.drop_index('ix_care_events_date', table_name='care_events')
+    op.drop_index('ix_observations_date', table_name='observations')
+    op.drop_table('plant_archives')
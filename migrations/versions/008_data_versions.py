@@ -0,0 +1,32 @@
+"""Version counters for in-memory cache invalidation
+
+Revision ID: 008_data_versions
+Revises: 007_plant_archives
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_data_versions'
+down_revision = '007_plant_archives'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # The table (and its row) may already exist if the app's create_all ran against this database
+    if not sa.inspect(bind).has_table('data_versions'):
+        op.create_table(
+            'data_versions',
+            sa.Column('name', sa.String(length=50), primary_key=True, nullable=False),
+            sa.Column('value', sa.BigInteger(), nullable=False),
+        )
+    if not bind.execute(sa.text("SELECT COUNT(*) FROM data_versions WHERE name = 'catalog'")).scalar():
+        op.execute("INSERT INTO data_versions (name, value) VALUES ('catalog', 1)")
+
+
+def downgrade() -> None:
+    op.drop_table('data_versions')
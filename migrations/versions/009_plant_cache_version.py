@@ -0,0 +1,24 @@
+"""Cache version stamp for logbook plant fragments
+
+Revision ID: 009_plant_cache_version
+Revises: 008_data_versions
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_plant_cache_version'
+down_revision = '008_data_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('garden_plants', sa.Column('cache_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('garden_plants') as batch_op:
+        batch_op.drop_column('cache_version')
@@ -0,0 +1,46 @@
+"""Companion planting rules table
+
+Revision ID: 010_companion_rules
+Revises: 009_plant_cache_version
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app import COMPANION_SEED
+
+# revision identifiers, used by Alembic.
+revision = '010_companion_rules'
+down_revision = '009_plant_cache_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # The table may already exist if the app's create_all ran against this database
+    if not sa.inspect(bind).has_table('companion_rules'):
+        op.create_table(
+            'companion_rules',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('plant_a', sa.String(length=100), nullable=False),
+            sa.Column('plant_b', sa.String(length=100), nullable=False),
+            sa.Column('relation', sa.String(length=10), nullable=False),
+            sa.Column('notes', sa.String(length=300), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('plant_a', 'plant_b', name='uq_companion_rules_pair'),
+        )
+        op.create_index('ix_companion_rules_plant_b', 'companion_rules', ['plant_b'])
+
+    # Seed with the pairs that used to be hard-coded in the detail page (shared with app startup).
+    if not bind.execute(sa.text("SELECT COUNT(*) FROM companion_rules")).scalar():
+        rules = sa.table('companion_rules', sa.column('plant_a'), sa.column('plant_b'), sa.column('relation'))
+        op.bulk_insert(rules, [
+            {'plant_a': min(a, b), 'plant_b': max(a, b), 'relation': rel} for a, b, rel in COMPANION_SEED
+        ])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_companion_rules_plant_b', table_name='companion_rules')
+    op.drop_table('companion_rules')
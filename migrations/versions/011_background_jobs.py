@@ -0,0 +1,91 @@
+"""Background job table, care digests and stored care schedule
+
+Revision ID: 011_background_jobs
+Revises: 010_companion_rules
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_background_jobs'
+down_revision = '010_companion_rules'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # Tables may already exist if the app's create_all ran against this database
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def _add_days(date_sql, days_sql):
+    if op.get_bind().dialect.name == 'sqlite':
+        return f"date({date_sql}, '+' || ({days_sql}) || ' days')"
+    return f"DATE_ADD({date_sql}, INTERVAL ({days_sql}) DAY)"
+
+
+def upgrade() -> None:
+    op.add_column('garden_plants', sa.Column('last_watered_date', sa.Date(), nullable=True))
+    op.add_column('garden_plants', sa.Column('last_fertilized_date', sa.Date(), nullable=True))
+    op.add_column('garden_plants', sa.Column('next_water_date', sa.Date(), nullable=True))
+    op.add_column('garden_plants', sa.Column('next_fertilize_date', sa.Date(), nullable=True))
+
+    # Backfill from existing history (intervals mirror WATER_INTERVALS / FERTILIZE_INTERVALS)
+    op.execute("""
+        UPDATE garden_plants SET
+            last_watered_date = (SELECT MAX(c.date) FROM care_events c
+                                 WHERE c.plant_id = garden_plants.id AND LOWER(c.type) = 'watering' AND c.date IS NOT NULL),
+            last_fertilized_date = (SELECT MAX(c.date) FROM care_events c
+                                    WHERE c.plant_id = garden_plants.id AND LOWER(c.type) = 'fertilizing' AND c.date IS NOT NULL)
+    """)
+    water_days = ("CASE LOWER(category) WHEN 'flower' THEN 3 WHEN 'fruit' THEN 2 WHEN 'vegetable' THEN 2 "
+                  "WHEN 'herb' THEN 2 WHEN 'tree' THEN 4 ELSE 3 END")
+    fertilize_days = ("CASE LOWER(category) WHEN 'herb' THEN 21 WHEN 'tree' THEN 30 ELSE 14 END")
+    op.execute(f"""
+        UPDATE garden_plants SET
+            next_water_date = {_add_days('COALESCE(last_watered_date, planting_date)', water_days)},
+            next_fertilize_date = {_add_days('COALESCE(last_fertilized_date, planting_date)', fertilize_days)}
+    """)
+
+    if not _has_table('scheduled_jobs'):
+        op.create_table(
+            'scheduled_jobs',
+            sa.Column('name', sa.String(length=64), nullable=False),
+            sa.Column('schedule', sa.String(length=64), nullable=False),
+            sa.Column('next_run_at', sa.DateTime(), nullable=False),
+            sa.Column('locked_by', sa.String(length=100), nullable=True),
+            sa.Column('locked_until', sa.DateTime(), nullable=True),
+            sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('last_started_at', sa.DateTime(), nullable=True),
+            sa.Column('last_finished_at', sa.DateTime(), nullable=True),
+            sa.Column('last_status', sa.String(length=20), nullable=True),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('last_duration_ms', sa.Float(), nullable=True),
+            sa.Column('max_duration_ms', sa.Float(), nullable=True),
+            sa.Column('total_duration_ms', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('run_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('failure_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.PrimaryKeyConstraint('name'),
+        )
+        op.create_index('ix_scheduled_jobs_next_run_at', 'scheduled_jobs', ['next_run_at'])
+    if not _has_table('care_digests'):
+        op.create_table(
+            'care_digests',
+            sa.Column('digest_date', sa.Date(), nullable=False),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('digest_date'),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('care_digests')
+    op.drop_index('ix_scheduled_jobs_next_run_at', table_name='scheduled_jobs')
+    op.drop_table('scheduled_jobs')
+    with op.batch_alter_table('garden_plants') as batch_op:
+        batch_op.drop_column('next_fertilize_date')
+        batch_op.drop_column('next_water_date')
+        batch_op.drop_column('last_fertilized_date')
+        batch_op.drop_column('last_watered_date')
@@ -0,0 +1,39 @@
+"""Never reuse garden plant ids
+
+Revision ID: 012_plant_id_autoincrement
+Revises: 011_background_jobs
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '012_plant_id_autoincrement'
+down_revision = '011_background_jobs'
+branch_labels = None
+depends_on = None
+
+# Highest id ever handed out, including plants that only live on in plant_archives
+MAX_PLANT_ID = ("SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM garden_plants "
+                "UNION ALL SELECT MAX(plant_id) FROM plant_archives) ids")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        # Plain INTEGER PRIMARY KEY reuses freed rowids; AUTOINCREMENT keeps a high-water mark
+        with op.batch_alter_table('garden_plants', recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+            pass
+        op.execute("DELETE FROM sqlite_sequence WHERE name = 'garden_plants'")
+        op.execute(f"INSERT INTO sqlite_sequence (name, seq) SELECT 'garden_plants', COALESCE(({MAX_PLANT_ID}), 0)")
+    elif bind.dialect.name == 'mysql':
+        next_id = (bind.exec_driver_sql(MAX_PLANT_ID).scalar() or 0) + 1
+        op.execute(f"ALTER TABLE garden_plants AUTO_INCREMENT = {int(next_id)}")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('garden_plants', recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+            pass
@@ -0,0 +1,46 @@
+"""Latest archived care dates on plant archives
+
+Revision ID: 013_archive_last_care
+Revises: 012_plant_id_autoincrement
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+import json
+import zlib
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013_archive_last_care'
+down_revision = '012_plant_id_autoincrement'
+branch_labels = None
+depends_on = None
+
+CARE_FIELDS = {'watering': 'last_watered_date', 'fertilizing': 'last_fertilized_date'}
+
+
+def upgrade() -> None:
+    op.add_column('plant_archives', sa.Column('last_watered_date', sa.Date(), nullable=True))
+    op.add_column('plant_archives', sa.Column('last_fertilized_date', sa.Date(), nullable=True))
+
+    # Backfill from the archived care events (dates are ISO strings in the payload)
+    bind = op.get_bind()
+    archives = sa.table('plant_archives', sa.column('plant_id'), sa.column('payload'),
+                        *[sa.column(f, sa.Date()) for f in CARE_FIELDS.values()])
+    for plant_id, payload in bind.execute(sa.select(archives.c.plant_id, archives.c.payload)).all():
+        last = {}
+        for row in json.loads(zlib.decompress(payload)).get('care_events', []):
+            field = CARE_FIELDS.get((row.get('type') or '').lower())
+            if field and row.get('date') and row['date'] > last.get(field, ''):
+                last[field] = row['date']
+        if last:
+            bind.execute(archives.update().where(archives.c.plant_id == plant_id).values(
+                **{f: date.fromisoformat(d) for f, d in last.items()}))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('plant_archives') as batch_op:
+        batch_op.drop_column('last_fertilized_date')
+        batch_op.drop_column('last_watered_date')
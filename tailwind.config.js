@@ -3,6 +3,7 @@ module.exports = {
   content: [
     "./templates/**/*.html",
     "./static/**/*.js",
+    "./app/**/*.py",
   ],
   theme: {
     extend: {},
@@ -10,5 +11,6 @@ module.exports = {
   plugins: [require("daisyui")],
   daisyui: {
     themes: ["garden", "light"],
+    logs: false,
   },
 }
\ No newline at end of file